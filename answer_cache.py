@@ -0,0 +1,106 @@
+import hashlib
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+from retrieval import STOPWORDS
+
+# ─────────────────────────────────────────────────────────────
+# ANSWER CACHE
+#   First-turn AyA answers keyed by the normalized problem text. Lookups
+#   try the exact hash first, then cosine similarity over hashed character
+#   trigram vectors, so "derive the lens formula" and "Derive lens formula!"
+#   share one answer. Trigrams hardly move when only a number or a short
+#   code changes, so a similar problem must also carry exactly the same
+#   numbers and short terms (SN1/E2, 0.01 M) or it is not a hit.
+# ─────────────────────────────────────────────────────────────
+VECTOR_DIM = 2048   # 2000 entries -> 16 MB of float32 rows
+NGRAM      = 3
+
+
+def normalize(text):
+    text = "".join(c if c.isalnum() else " " for c in text.casefold())
+    return " ".join(text.split())
+
+
+def markers(text):
+    # The tokens a near-identical problem may not differ in: anything with
+    # a digit, and words of up to three letters that aren't stopwords.
+    return tuple(w for w in text.split() if any(c.isdigit() for c in w) or (len(w) <= 3 and w not in STOPWORDS))
+
+
+def ngram_vector(text):
+    padded = f" {text} "
+    grams  = [zlib.crc32(padded[i:i + NGRAM].encode("utf-8")) % VECTOR_DIM for i in range(len(padded) - NGRAM + 1)]
+    vec    = np.bincount(grams, minlength=VECTOR_DIM).astype(np.float32)
+    norm   = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+class AnswerCache:
+    def __init__(self, max_entries=2000, ttl=24 * 3600, threshold=0.92):
+        self.max_entries = max_entries
+        self.ttl         = ttl
+        self.threshold   = threshold
+        self.entries     = OrderedDict()   # digest -> (answer, created_at, row)
+        self.vectors     = np.zeros((max_entries, VECTOR_DIM), dtype=np.float32)
+        self.row_digest  = [None] * max_entries
+        self.row_markers = [None] * max_entries
+        self.free_rows   = list(range(max_entries - 1, -1, -1))
+        self.stats       = {"exact_hits": 0, "similar_hits": 0, "misses": 0, "bypassed": 0}
+        self.lock        = threading.Lock()
+
+    def get(self, problem):
+        text   = normalize(problem)
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self.lock:
+            kind, match = "exact_hits", digest
+            if match not in self.entries and self.entries:
+                sims  = self.vectors @ ngram_vector(text)
+                marks = markers(text)
+                kind  = "similar_hits"
+                match = None
+                close = np.flatnonzero(sims >= self.threshold)
+                for row in close[np.argsort(-sims[close])]:   # most similar first
+                    if self.row_markers[row] == marks:
+                        match = self.row_digest[row]
+                        break
+
+            if match in self.entries:
+                answer, created_at, _ = self.entries[match]
+                if time.time() - created_at < self.ttl:
+                    self.entries.move_to_end(match)
+                    self.stats[kind] += 1
+                    return answer
+                self.drop(match)
+
+            self.stats["misses"] += 1
+            return None
+
+    def bypass(self):
+        with self.lock:
+            self.stats["bypassed"] += 1
+
+    def put(self, problem, answer):
+        text   = normalize(problem)
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        with self.lock:
+            if digest in self.entries:
+                self.drop(digest)
+            if not self.free_rows:
+                self.drop(next(iter(self.entries)))
+            row = self.free_rows.pop()
+            self.vectors[row]    = ngram_vector(text)
+            self.row_digest[row]  = digest
+            self.row_markers[row] = markers(text)
+            self.entries[digest]  = (answer, time.time(), row)
+
+    def drop(self, digest):
+        _, _, row = self.entries.pop(digest)
+        self.vectors[row]     = 0.0
+        self.row_digest[row]  = None
+        self.row_markers[row] = None
+        self.free_rows.append(row)
@@ -0,0 +1,683 @@
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import groq
+import httpx
+import openai
+from groq import Groq
+from openai import OpenAI
+
+from answer_cache import AnswerCache
+from grading_jobs import JobQueue
+from paper_gen import clean_input, delta_text, estimate_tokens, iter_paper, paper_context, paper_problems
+from paper_variants import VariantEngine, batch
+from question_bank import QuestionBank, paper_key
+from question_index import QuestionIndex, partition_key
+from scheduler import RateLimitScheduler
+from single_flight import SingleFlight, flight_key
+
+# ─────────────────────────────────────────────────────────────
+# BACKEND
+#   Everything that talks to the model: paper generation, MCQ scoring and
+#   exam grading, and AyA's hedged answers, with the shared resources they
+#   need. Nothing here touches Streamlit, so the same object runs inside
+#   the app process or behind the HTTP service (service.py) that UI
+#   replicas reach through backend_client.RemoteBackend.
+#
+#   Settings are read from the app's secrets, table by table; the defaults
+#   below apply to anything left out.
+# ─────────────────────────────────────────────────────────────
+
+# Groq's API host; point it at any OpenAI-compatible server (such as the
+# benchmark stub in llm_stub.py) with a GROQ_BASE_URL secret.
+GROQ_BASE_URL = "https://api.groq.com"
+
+# Connection pool shared by every call through a client; [llm_pool].
+LLM_POOL = {
+    "max_connections":           64,
+    "max_keepalive_connections": 32,
+    "keepalive_expiry":          120.0,
+}
+
+# Generated papers are cached on disk per normalized paper settings;
+# [question_bank].
+QUESTION_BANK = {
+    "path":       "data/question_bank.db",
+    "pool_size":  5,                  # distinct papers kept per settings combo
+    "ttl":        7 * 24 * 3600,      # seconds before a paper is retired
+    "max_papers": 5000,               # LRU cap across all settings
+}
+
+# Once the bank holds enough questions for a setting, each new paper is a
+# local variant of them (sampled, options shuffled) instead of a model call;
+# [paper_variants].
+PAPER_VARIANTS = {
+    "min_ratio": 3.0,    # banked questions needed, as a multiple of the paper size
+    "refresh":   60.0,   # seconds a setting's question pool is reused before re-reading
+}
+
+# Every generated question, per chapter, so later papers don't repeat
+# earlier ones; [question_index].
+QUESTION_INDEX = {
+    "path":              "data/question_index.db",
+    "threshold":         0.6,    # estimated word-shingle Jaccard that counts as a repeat
+    "max_per_partition": 2000,   # questions remembered per board/class/subject/chapter
+    "refresh":           30.0,   # seconds between reads of rows other processes added
+}
+
+# First-turn AyA answers shared across sessions; [answer_cache].
+ANSWER_CACHE = {
+    "max_entries": 2000,
+    "ttl":         24 * 3600,
+    "threshold":   0.92,   # trigram cosine similarity that counts as the same doubt
+}
+
+# Groq limits for the shared API key, enforced across all callers;
+# [rate_limits], to match your plan.
+RATE_LIMITS = {
+    "rpm": 30,      # requests per minute
+    "tpm": 12000,   # tokens per minute, prompt plus expected reply
+}
+
+# Background exam feedback, kept on disk so it survives reconnects;
+# [grading_jobs].
+GRADING_JOBS = {
+    "path":    "data/grading_jobs.db",
+    "workers": 4,
+    "ttl":     7 * 24 * 3600,   # seconds a finished job can still be reopened
+}
+
+# Prompt budget (tokens, excluding the 6000-token reply) per model;
+# [aya_context_budget].
+AYA_CONTEXT_BUDGET = {
+    "llama-3.3-70b-versatile": 12000,
+    "llama-3.1-70b-versatile": 12000,
+    "mixtral-8x7b-32768":      12000,
+    "default":                 6000,
+}
+
+
+def load_secrets(path):
+    # The app's .streamlit/secrets.toml, for processes that run without
+    # Streamlit. tomllib (Python 3.11+) is only needed by those processes.
+    import tomllib
+    if not os.path.exists(path):
+        return {}
+    with open(path, "rb") as f:
+        return tomllib.load(f)
+
+
+# ── Models ────────────────────────────────────────────────────
+DEFAULT_MODELS    = ["llama-3.3-70b-versatile"]
+MODEL_CATALOG_TTL = 600   # seconds before a background refresh is kicked off
+
+class ModelCatalog:
+    # Process-wide model list. Reads never touch the network: a stale list
+    # is served while a daemon thread refreshes it, and a failed refresh
+    # keeps the last known good list.
+    def __init__(self, fetch, ttl=MODEL_CATALOG_TTL):
+        self.fetch      = fetch
+        self.ttl        = ttl
+        self.models     = list(DEFAULT_MODELS)
+        self.expires_at = 0.0
+        self.refreshing = False
+        self.lock       = threading.Lock()
+
+    def get(self):
+        with self.lock:
+            if time.monotonic() >= self.expires_at and not self.refreshing:
+                self.refreshing = True
+                threading.Thread(target=self.refresh, daemon=True).start()
+            return list(self.models)
+
+    def refresh(self):
+        try:
+            models = self.fetch()
+        except Exception:
+            models = None
+        with self.lock:
+            if models:
+                self.models = models
+            # Failures also wait a full TTL so a Groq outage isn't hammered.
+            self.expires_at = time.monotonic() + self.ttl
+            self.refreshing = False
+
+
+# ── AyA ───────────────────────────────────────────────────────
+AYA_SYSTEM_PROMPT = """You are **AyA**, the Lead AI Tutor at **The Molecular Man Expert Tuition Solutions**, Madurai.
+Your mission: guide students from "Zero" (absolute beginner) to "Hero" (advanced mastery).
+Your tone: encouraging, clear, patient, and intellectually rigorous.
+
+### RESPONSE GUIDELINES
+1. **Conversational Follow-ups:** Answer follow-up questions directly without repeating the full structure.
+2. **Main Problem Structure:**
+   - 🧠 **CONCEPT** — What principle is at play?
+   - 🌍 **REAL-WORLD CONTEXT** — Where do we see this in life?
+   - ✍️ **SOLUTION** — Step-by-step working.
+   - ✅ **ANSWER** — Clear final answer.
+   - 🚀 **HERO TIP** — An insight that turns good students into great ones.
+3. **Formatting:** Bold for keywords, LaTeX for all equations.
+4. **Scope:** Chemistry, Physics, Maths, Biology (Classes 6–12, NEET, JEE, Boards).
+"""
+
+AYA_MODELS = ["llama-3.3-70b-versatile", "llama-3.1-70b-versatile", "mixtral-8x7b-32768"]
+
+STREAM_DROPPED = "\n\n⚠️ *Connection dropped mid-answer — ask AyA to continue.*"
+
+AYA_RECENT_MESSAGES = 4     # latest messages always sent verbatim
+AYA_REPLY_TOKENS    = 1000  # typical answer size, charged against the TPM budget
+AYA_SUMMARY_TOKENS  = 200   # size of the stand-in for an older answer
+AYA_HEDGE_DELAY     = 2.5   # seconds without a first token before the next model is also tried
+
+def relay_stream(first, chunks):
+    yield first
+    try:
+        for chunk in chunks:
+            text = delta_text(chunk)
+            if text:
+                yield text
+    except Exception:
+        # Tokens are already on screen, so there is no falling back now.
+        yield STREAM_DROPPED
+
+# What AyA reads from a chat message, and its type. The memoized counts
+# travel too, so a remote backend doesn't recount the history every turn.
+AYA_MESSAGE_FIELDS = {"role": str, "content": str, "doc": str, "excerpts": str, "tokens": int, "summary": str}
+
+def message_tokens(msg):
+    # Memoized on the message so each turn only counts what is new.
+    if "tokens" not in msg:
+        msg["tokens"] = estimate_tokens(msg["content"])
+    return msg["tokens"]
+
+def summarize_answer(text, limit=AYA_SUMMARY_TOKENS):
+    # Extractive: AyA puts the result under her ANSWER heading, so that is the
+    # part worth keeping; otherwise fall back to the opening of the reply.
+    lines = text.splitlines()
+    start = next((i for i, ln in enumerate(lines) if "ANSWER" in ln), None)
+    if start is not None:
+        end  = next((i for i in range(start + 1, len(lines)) if "HERO TIP" in lines[i]), len(lines))
+        body = "\n".join(lines[start:end])
+    else:
+        body = text
+    body = " ".join(body.split())
+    if len(body) > limit * 4:
+        body = body[:limit * 4].rsplit(" ", 1)[0] + " …"
+    return f"(Earlier answer, summarised) {body}"
+
+def message_summary(msg):
+    if "summary" not in msg:
+        msg["summary"] = summarize_answer(msg["content"])
+    return msg["summary"]
+
+def build_aya_context(messages, model, budgets=AYA_CONTEXT_BUDGET):
+    # System prompt + the original problem + as many of the latest turns as
+    # the model's budget allows. Beyond the last AYA_RECENT_MESSAGES, AyA's
+    # own answers are replaced by their summaries; the current question is
+    # always kept.
+    budget = budgets.get(model, budgets["default"])
+    used   = estimate_tokens(AYA_SYSTEM_PROMPT)
+
+    problem = messages[0]["content"]
+    if message_tokens(messages[0]) > budget // 2:
+        problem = problem[:budget * 2] + "\n…(truncated)"
+    problem += messages[0].get("excerpts", "")
+    used += estimate_tokens(problem)
+
+    kept = []
+    for age, msg in enumerate(reversed(messages[1:])):
+        content, tokens = msg["content"], message_tokens(msg)
+        if age >= AYA_RECENT_MESSAGES and msg["role"] == "assistant":
+            content = message_summary(msg)
+            tokens  = estimate_tokens(content)
+        if kept and used + tokens > budget:
+            break
+        kept.append({"role": msg["role"], "content": content})
+        used += tokens
+
+    return (
+        [{"role": "system", "content": AYA_SYSTEM_PROMPT}, {"role": messages[0]["role"], "content": problem}]
+        + kept[::-1]
+    )
+
+class CircuitBreaker:
+    # Process-wide record of failing models. After `threshold` failures in a
+    # row a model is skipped for `cooldown` seconds, then one call is let
+    # through again to probe it; the rest keep skipping it until that call
+    # succeeds, or for another cooldown.
+    def __init__(self, threshold=2, cooldown=60.0):
+        self.threshold  = threshold
+        self.cooldown   = cooldown
+        self.failures   = {}
+        self.open_until = {}
+        self.lock       = threading.Lock()
+
+    def allow(self, model):
+        with self.lock:
+            until = self.open_until.get(model)
+            if until is None:
+                return True
+            now = time.monotonic()
+            if now < until:
+                return False
+            # Half-open: this caller is the probe.
+            self.open_until[model] = now + self.cooldown
+            return True
+
+    def record(self, model, ok):
+        with self.lock:
+            if ok:
+                self.failures.pop(model, None)
+                self.open_until.pop(model, None)
+                return
+            self.failures[model] = self.failures.get(model, 0) + 1
+            if self.failures[model] >= self.threshold:
+                self.open_until[model] = time.monotonic() + self.cooldown
+
+def abort_stream(stream, timer):
+    # Closes an SDK stream another thread may be blocked reading. close()
+    # alone leaves that read waiting for the model's next byte, so the
+    # socket is shut down first.
+    timer.finish(outcome="cancelled")
+    response = getattr(stream, "response", None)
+    network  = response.extensions.get("network_stream") if response is not None else None
+    sock     = network.get_extra_info("socket") if network is not None else None
+    if sock is not None:
+        try:
+            sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+    stream.close()
+
+class HedgeRace:
+    # The attempts of one hedged AyA call. The first to produce a token wins
+    # and aborts every other attempt, whether or not it has a token yet.
+    def __init__(self):
+        self.won     = False
+        self.streams = {}   # hop -> (SDK stream, its CallTimer)
+        self.lock    = threading.Lock()
+
+    def join(self, hop, stream, timer):
+        # False, and the stream aborted, if the race is already over.
+        with self.lock:
+            if not self.won:
+                self.streams[hop] = (stream, timer)
+                return True
+        abort_stream(stream, timer)
+        return False
+
+    def win(self, hop):
+        with self.lock:
+            if self.won:
+                return False
+            self.won = True
+            losers   = [s for h, s in self.streams.items() if h != hop]
+        for stream, timer in losers:
+            abort_stream(stream, timer)
+        return True
+
+
+# ── Grading ───────────────────────────────────────────────────
+GRADE_TOKENS = 250   # grading prompt template plus verdict for one answer
+
+def grade_mcq(questions, user_answers):
+    # Scored and explained locally from the explanations generated with each
+    # question, so submitting never waits on the model.
+    score = 0
+    report = ""
+
+    for q in questions:
+        q_id    = str(q["id"])
+        u_ans   = user_answers.get(q_id)
+        c_ans   = q["correct_answer"]
+        if u_ans == c_ans:
+            score += 1
+            continue
+        distractors = q.get("distractors") if isinstance(q.get("distractors"), dict) else {}
+        why_wrong   = distractors.get(u_ans) or "This option does not satisfy the question."
+        why_right   = q.get("explanation") or "Revise this concept in the chapter."
+        report += (
+            f"#### Q{q['id']}. {q['question']}\n"
+            f"❌ **Your answer:** {u_ans} — {why_wrong}\n\n"
+            f"✅ **Correct answer:** {c_ans} — {why_right}\n\n"
+        )
+
+    if score == len(questions):
+        report = "### 🏆 Perfect Score!\nYou have completely mastered this topic. Outstanding work."
+    else:
+        report = "### 🔍 Scope for Improvement\n" + report
+    return {"score": score, "total": len(questions), "report": report}
+
+
+class Backend:
+    def __init__(self, secrets, metrics):
+        def settings(table, defaults):
+            return {**defaults, **secrets.get(table, {})}
+
+        api_key  = secrets["GROQ_API_KEY"]
+        base_url = secrets.get("GROQ_BASE_URL", GROQ_BASE_URL).rstrip("/")
+
+        self.metrics   = metrics
+        self.scheduler = RateLimitScheduler(**settings("rate_limits", RATE_LIMITS))
+        self.flights   = SingleFlight()
+        self.bank      = QuestionBank(**settings("question_bank", QUESTION_BANK))
+        self.index     = QuestionIndex(**settings("question_index", QUESTION_INDEX))
+        self.variants  = VariantEngine(self.bank, **settings("paper_variants", PAPER_VARIANTS))
+        self.answers   = AnswerCache(**settings("answer_cache", ANSWER_CACHE))
+        self.breaker   = CircuitBreaker()
+        self.budgets   = settings("aya_context_budget", AYA_CONTEXT_BUDGET)
+
+        # Long-lived clients so TLS sessions and keep-alive connections are
+        # reused across calls. Every response also feeds its rate-limit
+        # headers to the scheduler, which also retries 429s, 5xx and dropped
+        # connections, so the SDKs' own retries are off.
+        limits = httpx.Limits(**settings("llm_pool", LLM_POOL))
+        hooks  = {"response": [self.scheduler.observe]}
+        self.groq   = Groq(
+            api_key=api_key, base_url=base_url, max_retries=0,
+            http_client=groq.DefaultHttpxClient(limits=limits, event_hooks=hooks),
+        )
+        self.client = OpenAI(
+            api_key=api_key,
+            base_url=f"{base_url}/openai/v1",
+            max_retries=0,
+            http_client=openai.DefaultHttpxClient(limits=limits, event_hooks=hooks),
+        )
+
+        self.jobs = JobQueue(**settings("grading_jobs", GRADING_JOBS))
+        self.jobs.register("mcq_summary", self.mcq_summary_job)
+        self.jobs.register("descriptive", self.descriptive_job)
+
+        self.catalog = ModelCatalog(self.fetch_models)
+        self.catalog.get()   # start warming in the background straight away
+
+    # ── Models ────────────────────────────────────────────────
+    def models(self):
+        return self.catalog.get()
+
+    def fetch_models(self):
+        # Coalesced, so callers arriving together share one listing call.
+        return self.flights.call(flight_key("models"), self.list_models)
+
+    def list_models(self):
+        self.scheduler.acquire("background")
+        models = self.scheduler.requeue(lambda: self.metrics.timer("models", None).call(self.client.models.list), "background")
+        return sorted([m.id for m in models.data])
+
+    # ── Papers ────────────────────────────────────────────────
+    def paper(self, model, board, cls, subject, chapter, num, difficulty, q_type, on_wait=None):
+        # Yields the paper question by question. A variant of the banked
+        # questions, or else a pooled paper, is replayed from the question
+        # bank; a freshly generated one is added once complete.
+        safe_sub  = clean_input(subject)
+        safe_chap = clean_input(chapter)
+
+        variant = self.variants.next_paper(board, cls, safe_sub, safe_chap, difficulty, q_type, int(num))
+        if variant:
+            yield from variant
+            return
+
+        key    = paper_key(board, cls, safe_sub, safe_chap, difficulty, q_type, num)
+        cached = self.bank.draw(key)
+        if cached:
+            yield from cached
+            return
+
+        context = paper_context(board, cls, safe_sub, safe_chap)
+        part    = partition_key(board, cls, safe_sub, safe_chap)
+
+        def generate():
+            questions = []
+            for q in iter_paper(self.client, model, context, int(num), difficulty, q_type, self.scheduler, self.metrics,
+                                on_wait, is_repeat=lambda q: self.index.is_duplicate(part, q["question"])):
+                questions.append(q)
+                yield q
+            if not questions:
+                raise RuntimeError("the model returned no usable questions")
+            if not paper_problems(questions, num, q_type):
+                self.bank.add(key, questions)
+                self.index.record(part, [q["question"] for q in questions])
+
+        # A class given the same settings at once shares one generation:
+        # later callers replay what is written so far and follow the rest live.
+        yield from self.flights.stream(flight_key(key, model), generate)
+
+    def paper_variants(self, board, cls, subject, chapter, difficulty, q_type, num, count, seed):
+        # `count` distinct papers from the banked questions alone; ValueError
+        # when there aren't enough of them.
+        _, pool = self.variants.pool(board, cls, clean_input(subject), clean_input(chapter), difficulty, q_type)
+        if len(pool) < num:
+            raise ValueError(f"only {len(pool)} questions are banked for these settings")
+        return batch(pool, num, count, seed)
+
+    # ── Grading ───────────────────────────────────────────────
+    def grade_mcq(self, questions, user_answers):
+        return grade_mcq(questions, user_answers)
+
+    def submit_grading(self, model, q_type, config, questions, answers):
+        # Queues the feedback that needs the model and returns the job id.
+        payload = {
+            "model": model, "q_type": q_type, "config": config,
+            "questions": questions, "answers": answers,
+            "exam": [config.get("board","Board"), config.get("class","Class"), config.get("subject","Subject")],
+        }
+        return self.jobs.submit("mcq_summary" if q_type == "MCQ" else "descriptive", payload)
+
+    def job(self, job_id):
+        return self.jobs.get(job_id)
+
+    def retry(self, job_id):
+        return self.jobs.retry(job_id)
+
+    def mcq_summary(self, model, questions, user_answers, board, cls, subject, on_wait=None):
+        # Optional holistic advice, streamed into the results view after the
+        # local report is already on screen.
+        wrong = [q for q in questions if user_answers.get(str(q["id"])) != q["correct_answer"]]
+        score = len(questions) - len(wrong)
+        mistakes = "".join(
+            f"Q: {q['question']}\nStudent: {user_answers.get(str(q['id']))}\nCorrect: {q['correct_answer']}\n\n"
+            for q in wrong
+        )
+        prompt = f"""
+The student scored {score}/{len(questions)} in a {board} Class {cls} {subject} MCQ test.
+Mistakes:
+{mistakes}
+Each mistake has already been explained to the student. In under 150 words, name the
+concepts they should revise and one concrete study tip. Clean Markdown, no per-question breakdown.
+"""
+        # Exam feedback, so it queues with grading rather than behind chat.
+        tokens = estimate_tokens(prompt) + 250
+        self.scheduler.acquire("grade", tokens, on_wait)
+        stream = self.scheduler.requeue(lambda: self.metrics.timer("mcq_summary", model).call(
+            self.client.chat.completions.create,
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3,
+            stream=True,
+        ), "grade", tokens, on_wait)
+        for chunk in stream:
+            text = delta_text(chunk)
+            if text:
+                yield text
+
+    def grade_descriptive_answer(self, model, q, answer, board, cls, subject, tokens=0):
+        marks = q.get("marks", 1)
+        prompt = f"""
+You are a strict examiner for {board} Class {cls} {subject}.
+Grade this one descriptive answer per the standard Board marking scheme.
+
+Question ({marks} marks): {q['question']}
+Student Answer: {answer}
+
+Return ONLY a JSON object:
+{{"awarded_marks": <number from 0 to {marks}>, "justification": "<one or two sentences>", "missing_keywords": ["<key term or concept the answer lacks>"]}}
+"""
+        resp = self.scheduler.requeue(lambda: self.metrics.timer("grade_descriptive", model).call(
+            self.client.chat.completions.create,
+            model=model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.2,
+            response_format={"type": "json_object"},
+        ), "grade", tokens)
+        verdict = json.loads(resp.choices[0].message.content)
+        return {
+            "awarded":  min(max(float(verdict.get("awarded_marks", 0)), 0.0), float(marks)),
+            "reason":   str(verdict.get("justification", "")).strip(),
+            "missing":  [str(k) for k in verdict.get("missing_keywords", []) if str(k).strip()],
+        }
+
+    def grade_descriptive(self, model, questions, user_answers, board, cls, subject, on_wait=None, progress=None):
+        # Each answer is graded by its own concurrent call against a fixed JSON
+        # shape, and the total is summed here rather than trusted from the model.
+        results = []
+        futures = {}
+
+        with ThreadPoolExecutor(max_workers=min(8, len(questions)) or 1) as pool:
+            for q in questions:
+                answer = (user_answers.get(str(q["id"])) or "").strip()
+                result = {"id": q["id"], "question": q["question"], "marks": q.get("marks", 1), "answer": answer}
+                results.append(result)
+                if answer:
+                    tokens = estimate_tokens(q["question"] + answer) + GRADE_TOKENS
+                    self.scheduler.acquire("grade", tokens, on_wait)
+                    futures[q["id"]] = pool.submit(self.grade_descriptive_answer, model, q, answer, board, cls, subject, tokens)
+                else:
+                    result.update(awarded=0.0, reason="No answer provided.", missing=[])
+
+            by_id = {r["id"]: r for r in results}
+            for done, fut in enumerate(as_completed(futures.values()), start=1):
+                q_id = next(i for i, f in futures.items() if f is fut)
+                try:
+                    by_id[q_id].update(fut.result())
+                except Exception as e:
+                    by_id[q_id].update(awarded=None, reason=f"Could not be graded: {str(e)}", missing=[])
+                if progress:
+                    progress({"done": done, "total": len(futures)})
+
+        score = sum(r["awarded"] for r in results if r["awarded"] is not None)
+        total = sum(r["marks"] for r in results)
+        return {"score": score, "total": total, "results": results}
+
+    # Job handlers run on the job queue's threads; queue waits are reported
+    # through progress() for the results view to show.
+    def mcq_summary_job(self, payload, progress):
+        board, cls, subject = payload["exam"]
+        answers = payload["answers"]
+        if all(answers.get(str(q["id"])) == q["correct_answer"] for q in payload["questions"]):
+            return {"text": ""}
+        text, shown = "", 0.0
+        for piece in self.mcq_summary(
+            payload["model"], payload["questions"], answers, board, cls, subject,
+            on_wait=lambda position: progress({"queue": position}),
+        ):
+            text += piece
+            if time.monotonic() - shown > 0.5:
+                progress({"text": text})
+                shown = time.monotonic()
+        return {"text": text}
+
+    def descriptive_job(self, payload, progress):
+        board, cls, subject = payload["exam"]
+        return self.grade_descriptive(
+            payload["model"], payload["questions"], payload["answers"], board, cls, subject,
+            on_wait=lambda position: progress({"queue": position}), progress=progress,
+        )
+
+    # ── AyA ───────────────────────────────────────────────────
+    def aya(self, messages, on_wait=None):
+        # Yields AyA's answer to the latest message as it streams; yields
+        # nothing when no model could answer. PDF conversations arrive with
+        # their excerpts already on the opening message.
+        opening = messages[0]
+        # Only a fresh typed doubt is cacheable; follow-ups and PDF
+        # conversations depend on state beyond the problem text.
+        cacheable = len(messages) == 1 and not opening.get("doc")
+        if cacheable:
+            cached = self.answers.get(opening["content"])
+            if cached:
+                yield cached
+                return
+        else:
+            self.answers.bypass()
+
+        stream = self.open_aya_stream(messages, on_wait=on_wait)
+        if stream is None:
+            return
+        text = ""
+        for piece in stream:
+            text += piece
+            yield piece
+        if cacheable and not text.endswith(STREAM_DROPPED):
+            self.answers.put(opening["content"], text)
+
+    def hedge_attempt(self, context, model_id, race, out, hop=0, tokens=0):
+        # Runs one model up to its first token. The first attempt to get there
+        # wins the race and aborts the others, even those still waiting.
+        def attempt():
+            timer = self.metrics.timer("aya", model_id, hop=hop)
+
+            def create(**kwargs):
+                stream = self.groq.chat.completions.create(**kwargs)
+                race.join(hop, stream, timer)
+                return stream
+
+            return timer.call(create, messages=context, model=model_id, temperature=0.5, max_tokens=6000, stream=True)
+
+        try:
+            chunks = self.scheduler.requeue(attempt, "chat", tokens)
+            if race.won:
+                return
+            first  = ""
+            while not first:
+                first = delta_text(next(chunks))
+        except Exception:
+            if race.won:   # aborted by the winner, not the model's fault
+                return
+            self.breaker.record(model_id, False)
+            out.put((model_id, None, None))
+            return
+        self.breaker.record(model_id, True)
+        if race.win(hop):
+            out.put((model_id, first, chunks))
+        else:
+            chunks.close()
+
+    def open_aya_stream(self, messages, models=AYA_MODELS, hedge_delay=AYA_HEDGE_DELAY, on_wait=None):
+        # Hedged fallback: start the first healthy model, and whenever the
+        # current attempts fail or stay silent for hedge_delay, start the next
+        # one alongside. The first model to produce a token wins; the returned
+        # generator replays that token and streams the rest. A hedge is only
+        # started when the scheduler has a slot free right away.
+        candidates = [m for m in models if self.breaker.allow(m)] or list(models)
+        out, race  = queue.Queue(), HedgeRace()
+        launched = failed = 0
+
+        def launch(block=True):
+            nonlocal launched
+            model_id = candidates[launched]
+            context  = build_aya_context(messages, model_id, self.budgets)
+            tokens   = sum(estimate_tokens(m["content"]) for m in context) + AYA_REPLY_TOKENS
+            if self.scheduler.acquire("chat", tokens, on_wait=on_wait, block=block) is None:
+                return
+            args = (context, model_id, race, out, launched, tokens)
+            threading.Thread(target=self.hedge_attempt, args=args, daemon=True).start()
+            launched += 1
+
+        launch()
+        while failed < launched:
+            try:
+                model_id, first, chunks = out.get(timeout=hedge_delay if launched < len(candidates) else None)
+            except queue.Empty:
+                launch(block=False)
+                continue
+            if first is not None:
+                return relay_stream(first, chunks)
+            failed += 1
+            if failed == launched and launched < len(candidates):
+                launch()
+        return None
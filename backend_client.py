@@ -0,0 +1,114 @@
+import json
+
+import httpx
+
+from backend import AYA_MESSAGE_FIELDS, STREAM_DROPPED, ModelCatalog
+
+# ─────────────────────────────────────────────────────────────
+# BACKEND CLIENT
+#   RemoteBackend speaks to the generation service (service.py) with the
+#   same methods as backend.Backend, so the app runs unchanged whether the
+#   model work happens in-process or on a separate, separately scaled tier.
+#   Streamed answers are read event by event as they arrive.
+# ─────────────────────────────────────────────────────────────
+MODELS_TTL = 60   # seconds before the service's model list is fetched again
+
+
+class RemoteBackend:
+    def __init__(self, url, token=None, timeout=30.0):
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        # Streams may sit silent while a job waits for a rate-limit slot, so
+        # only connecting is bounded; reads wait as long as the model does.
+        self.http = httpx.Client(
+            base_url=url.rstrip("/"), headers=headers,
+            timeout=httpx.Timeout(timeout, read=None),
+            limits=httpx.Limits(max_connections=64, max_keepalive_connections=32),
+        )
+        # Same catalog as in-process: renders get the last list straight
+        # away and a daemon thread asks the service for a new one.
+        self.catalog = ModelCatalog(self.fetch_models, MODELS_TTL)
+        self.catalog.get()
+
+    def call(self, method, path, body=None):
+        resp = self.http.request(method, path, json=body)
+        if resp.status_code == 404 and path.startswith("/v1/grading/"):
+            return None
+        if resp.status_code in (400, 409):
+            raise ValueError(resp.json().get("error", "bad request"))
+        resp.raise_for_status()
+        return resp.json()
+
+    def events(self, path, body, on_wait=None):
+        # Yields the payload of each event until "done"; an "error" event
+        # is raised here as it would have been in-process.
+        with self.http.stream("POST", path, json=body) as resp:
+            if resp.status_code == 400:
+                resp.read()
+                raise ValueError(resp.json().get("error", "bad request"))
+            resp.raise_for_status()
+            for line in resp.iter_lines():
+                if not line:
+                    continue
+                event = json.loads(line)
+                if "queue" in event:
+                    if on_wait:
+                        on_wait(event["queue"])
+                elif "error" in event:
+                    raise RuntimeError(event["error"])
+                elif "done" in event:
+                    return
+                else:
+                    yield next(iter(event.values()))
+        raise ConnectionError("the generation service closed the stream early")
+
+    def models(self):
+        return self.catalog.get()
+
+    def fetch_models(self):
+        return self.call("GET", "/v1/models")["models"]
+
+    def paper(self, model, board, cls, subject, chapter, num, difficulty, q_type, on_wait=None):
+        body = {
+            "model": model, "board": board, "class": cls, "subject": subject, "chapter": chapter,
+            "num": int(num), "difficulty": difficulty, "q_type": q_type,
+        }
+        yield from self.events("/v1/papers", body, on_wait)
+
+    def paper_variants(self, board, cls, subject, chapter, difficulty, q_type, num, count, seed):
+        body = {
+            "board": board, "class": cls, "subject": subject, "chapter": chapter,
+            "difficulty": difficulty, "q_type": q_type, "num": int(num), "count": int(count), "seed": str(seed),
+        }
+        return self.call("POST", "/v1/papers/variants", body)["papers"]
+
+    def grade_mcq(self, questions, user_answers):
+        return self.call("POST", "/v1/grade/mcq", {"questions": questions, "answers": user_answers})
+
+    def submit_grading(self, model, q_type, config, questions, answers):
+        body = {"model": model, "q_type": q_type, "config": config, "questions": questions, "answers": answers}
+        return self.call("POST", "/v1/grading", body)["id"]
+
+    def job(self, job_id):
+        return self.call("GET", f"/v1/grading/{job_id}")
+
+    def retry(self, job_id):
+        found = self.call("POST", f"/v1/grading/{job_id}/retry")
+        if found is None:
+            raise ValueError("no such job")
+        return found["id"]
+
+    def aya(self, messages, on_wait=None):
+        # Only what AyA needs travels, memoized token counts and summaries
+        # included; the UI's own bookkeeping on each message stays behind.
+        body = {"messages": [{k: m[k] for k in AYA_MESSAGE_FIELDS if k in m} for m in messages]}
+        started = False
+        try:
+            for text in self.events("/v1/aya", body, on_wait):
+                started = True
+                yield text
+        except (httpx.HTTPError, ConnectionError):
+            # Mid-answer, the student keeps what arrived, as with a dropped
+            # model stream; before the first token it is a plain failure.
+            if not started:
+                raise
+            yield STREAM_DROPPED
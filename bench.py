@@ -0,0 +1,246 @@
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import pickle
+import resource
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from streamlit.testing.v1 import AppTest
+
+from llm_stub import StubConfig, start_server
+
+# ─────────────────────────────────────────────────────────────
+# BENCHMARK
+#   Drives the real app script through Streamlit's AppTest harness against
+#   the local LLM stub and reports p50/p95/p99 for each step of a student
+#   session, plus time-to-first-token, idle rerun time and memory per
+#   session. Nothing leaves the machine.
+#
+#   AppTest swaps a process-global runtime in and out around every run, so
+#   sessions inside one worker process run one after another; --workers
+#   runs several app processes side by side, each with its own stub.
+#
+#   python bench.py --sessions 12 --workers 3 --latency 0.3
+# ─────────────────────────────────────────────────────────────
+APP_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "updated TMM.py")
+
+
+def percentile(values, pct):
+    # Nearest-rank, so small samples report a value that actually occurred.
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank    = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def state_bytes(at):
+    # Pickled size of everything the session keeps between reruns; values
+    # that can't be pickled are counted by their repr.
+    total = 0
+    for value in at.session_state.to_dict().values():
+        try:
+            total += len(pickle.dumps(value))
+        except Exception:
+            total += len(repr(value))
+    return total
+
+
+class Session:
+    def __init__(self, index, args, base_url, data_dir, config):
+        self.tag     = f"benchtopic{index}x{os.getpid()}"
+        self.args    = args
+        self.config  = config
+        self.timings = {}
+        self.at      = AppTest.from_file(APP_SCRIPT, default_timeout=args.timeout)
+        self.at.secrets["GROQ_API_KEY"]   = "bench-key"
+        self.at.secrets["GROQ_BASE_URL"]  = base_url
+        self.at.secrets["question_bank"]  = {"path": os.path.join(data_dir, "question_bank.db")}
+        self.at.secrets["question_index"] = {"path": os.path.join(data_dir, "question_index.db")}
+        self.at.secrets["rate_limits"]    = {"rpm": args.rpm, "tpm": args.tpm}
+        self.at.secrets["grading_jobs"]   = {"path": os.path.join(data_dir, "grading_jobs.db")}
+        self.at.secrets["session_store"]  = {"path": os.path.join(data_dir, "sessions.db")}
+        self.at.secrets["metrics"]        = {
+            "jsonl_path": os.path.join(data_dir, "metrics", "events.jsonl"),
+            "prom_path":  os.path.join(data_dir, "metrics", "metrics.prom"),
+        }
+        # Every session asks a distinct doubt; don't let near-matches hit
+        # the answer cache, so the uncached path is what gets measured.
+        self.at.secrets["answer_cache"]   = {"threshold": 1.01}
+
+    def step(self, name, action, ttft=False):
+        started = time.time()
+        action()
+        self.timings[name] = time.time() - started
+        if self.at.exception:
+            raise RuntimeError(f"{name}: {self.at.exception[0].message}")
+        if ttft:
+            self.timings[f"{name}.ttft"] = self.first_token(started)
+
+    def first_token(self, since):
+        # Earliest streamed token from a completion this session asked for.
+        firsts = [
+            e["first_token"] for e in list(self.config.events)
+            if e["first_token"] and e["start"] >= since and self.tag in e["prompt"]
+        ]
+        return min(firsts) - since if firsts else None
+
+    def await_feedback(self):
+        # The results view polls its grading job once a second in the
+        # browser; here the script is rerun until the job has landed.
+        deadline = time.time() + self.args.timeout
+        while self.at.session_state.mt_job and time.time() < deadline:
+            time.sleep(0.05)
+            self.at.run()
+
+    def button(self, label):
+        return next(b for b in self.at.button if label in b.label)
+
+    def run(self):
+        at, args = self.at, self.args
+        self.step("cold_load", at.run)
+
+        at.text_area[0].input(f"Explain the {self.tag} reaction mechanism with one worked example.")
+        self.step("aya_first_turn", at.button(key="aya_send_text").click().run, ttft=True)
+        self.step("rerun_aya", at.run)
+        self.step("aya_follow_up", at.chat_input[0].set_value(f"Why does {self.tag} need a catalyst?").run, ttft=True)
+
+        for q_type in ("MCQ", "Descriptive"):
+            at.button(key="btn-mt").click().run()
+            at.text_input[0].input("Chemistry")
+            at.text_input[1].input(f"{self.tag} {q_type}")
+            [r for r in at.radio if r.label == "Question Type"][0].set_value(q_type)
+            at.number_input[0].set_value(args.questions)
+            name = q_type.lower()
+            self.step(f"generate_{name}", self.button("GENERATE").click().run, ttft=True)
+            if not at.session_state.mt_questions:
+                raise RuntimeError(f"generate_{name}: no questions")
+
+            for q in at.session_state.mt_questions:
+                if q_type == "MCQ":
+                    at.radio(key=f"ans_{q['id']}").set_value(q["options"][q["id"] % len(q["options"])])
+                else:
+                    at.text_area(key=f"ans_{q['id']}").input("A short answer naming the key idea.")
+            self.step(f"submit_{name}", self.button("Submit").click().run)
+            self.step(f"feedback_{name}", self.await_feedback)
+            self.step(f"rerun_{name}_results", at.run)
+            self.timings["state_bytes"] = state_bytes(at)
+            self.button("New Test").click().run()
+        return self.timings
+
+
+def max_rss_kb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def worker(args, indices):
+    # One app process: its own stub, question bank and process-wide caches,
+    # like one Streamlit server replica.
+    config   = StubConfig(args.latency, args.tokens_per_sec, args.fail_rate, args.fail_status, seed=indices[0])
+    server   = start_server(config)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    data_dir = tempfile.mkdtemp(prefix="bench-")
+    os.chdir(os.path.dirname(APP_SCRIPT))   # the app opens logo.png relative to here
+
+    samples, errors, baseline = [], [], None
+    for i in indices:
+        try:
+            samples.append(Session(i, args, base_url, data_dir, config).run())
+        except Exception as e:
+            errors.append(str(e))
+        gc.collect()
+        # Growth is measured after the first session, which also pays for
+        # imports and process-wide caches.
+        baseline = baseline or max_rss_kb()
+
+    server.shutdown()
+    events = list(config.events)
+    return {
+        "samples":     samples,
+        "errors":      errors,
+        "completions": len(events),
+        "failed":      sum(1 for e in events if not e["ok"]),
+        "rss_kb":      max_rss_kb(),
+        "growth_kb":   (max_rss_kb() - baseline) / (len(indices) - 1) if len(indices) > 1 else None,
+    }
+
+
+def report(results, wall):
+    samples = [t for r in results for t in r["samples"]]
+    names = []
+    for timings in samples:
+        names += [n for n in timings if n not in names]
+
+    rows = []
+    for name in names:
+        values = [t[name] for t in samples if t.get(name) is not None]
+        unit   = "B" if name == "state_bytes" else "ms"
+        scale  = 1 if unit == "B" else 1000
+        rows.append({
+            "step": name, "unit": unit, "n": len(values),
+            **{p: round(percentile(values, int(p[1:])) * scale, 1) if values else None for p in ("p50", "p95", "p99")},
+        })
+
+    growth  = [r["growth_kb"] for r in results if r["growth_kb"] is not None]
+    summary = {
+        "sessions":       len(samples),
+        "wall_s":         round(wall, 2),
+        "completions":    sum(r["completions"] for r in results),
+        "failed":         sum(r["failed"] for r in results),
+        "max_rss_mb":     round(max(r["rss_kb"] for r in results) / 1024, 1),
+        "rss_per_session_kb": round(sum(growth) / len(growth), 1) if growth else None,
+        "steps":          rows,
+    }
+
+    print(f"\n{'step':<34}{'n':>4}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for r in rows:
+        cells = "".join(f"{'—' if r[p] is None else r[p]:>10}" for p in ("p50", "p95", "p99"))
+        print(f"{r['step'] + ' (' + r['unit'] + ')':<34}{r['n']:>4}{cells}")
+    print(
+        f"\n{summary['sessions']} sessions in {summary['wall_s']}s · {summary['completions']} completions "
+        f"({summary['failed']} failed) · max RSS {summary['max_rss_mb']} MB per worker · "
+        f"RSS growth {summary['rss_per_session_kb']} KB per session"
+    )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the app's hot paths against a local LLM stub.")
+    parser.add_argument("--sessions",       type=int,   default=4)
+    parser.add_argument("--workers",        type=int,   default=1, help="app processes run side by side")
+    parser.add_argument("--questions",      type=int,   default=5, help="questions per generated paper")
+    parser.add_argument("--latency",        type=float, default=0.3, help="stub seconds before first byte")
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0)
+    parser.add_argument("--fail-rate",      type=float, default=0.0)
+    parser.add_argument("--fail-status",    type=int,   default=500)
+    parser.add_argument("--rpm",            type=float, default=1e6, help="app-side rate limit; high by default")
+    parser.add_argument("--tpm",            type=float, default=1e9)
+    parser.add_argument("--timeout",        type=float, default=120.0, help="seconds allowed per script run")
+    parser.add_argument("--json",           help="also write the summary and raw timings to this file")
+    args = parser.parse_args()
+
+    workers = max(1, min(args.workers, args.sessions))
+    shares  = [list(range(args.sessions))[w::workers] for w in range(workers)]
+    started = time.time()
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        results = list(pool.map(worker, [args] * workers, shares))
+    wall = time.time() - started
+
+    errors = [e for r in results for e in r["errors"]]
+    for e in errors:
+        print(f"session failed: {e}", file=sys.stderr)
+    summary = report(results, wall)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            samples = [t for r in results for t in r["samples"]]
+            json.dump({"args": vars(args), "summary": summary, "samples": samples, "errors": errors}, f, indent=2)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
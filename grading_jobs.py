@@ -0,0 +1,180 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# ─────────────────────────────────────────────────────────────
+# GRADING JOBS
+#   Exam feedback is worked out in the background so submitting never
+#   blocks a session. Jobs live in a SQLite table, so a browser that
+#   reconnects (or a process that restarts) picks its feedback up again by
+#   job id. Several processes may share the table: a job is taken by one
+#   of them with a conditional UPDATE, and the taker keeps a heartbeat on
+#   it, so only jobs whose owner has gone quiet are picked up again.
+# ─────────────────────────────────────────────────────────────
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          TEXT    PRIMARY KEY,
+    kind        TEXT    NOT NULL,
+    status      TEXT    NOT NULL,   -- queued | running | done | failed
+    payload     TEXT    NOT NULL,
+    progress    TEXT,
+    result      TEXT,
+    error       TEXT,
+    owner       TEXT,               -- queue running the job
+    created_at  REAL    NOT NULL,
+    updated_at  REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status, kind);
+"""
+
+HEARTBEAT  = 10.0   # seconds between touches of the jobs a queue is running
+STALE      = 60.0   # seconds without a touch before a running job is taken over
+
+
+class JobQueue:
+    def __init__(self, path, workers=4, ttl=7 * 24 * 3600):
+        self.ttl      = ttl
+        self.owner    = uuid.uuid4().hex
+        self.handlers = {}
+        self.pending  = set()   # jobs handed to the pool and not yet finished
+        self.lock     = threading.Lock()
+        self.pool     = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="grading")
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        with self.lock:
+            if "owner" not in [col[1] for col in self.db.execute("PRAGMA table_info(jobs)")]:
+                self.db.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+            self.db.execute("DELETE FROM jobs WHERE updated_at < ?", (time.time() - ttl,))
+            self.db.commit()
+        threading.Thread(target=self.heartbeat, daemon=True).start()
+
+    def register(self, kind, handler):
+        # handler(payload, progress) -> JSON-serializable result. The first
+        # registration of a kind also resumes its orphaned jobs.
+        resume = kind not in self.handlers
+        self.handlers[kind] = handler
+        if resume:
+            self.resume([kind])
+
+    def resume(self, kinds):
+        # Queued jobs, and running ones whose owner stopped its heartbeat;
+        # run() only goes ahead if this queue wins the claim.
+        marks = ", ".join("?" * len(kinds))
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT id FROM jobs WHERE kind IN ({marks}) "
+                f"AND (status = 'queued' OR (status = 'running' AND updated_at < ?))",
+                (*kinds, time.time() - STALE),
+            ).fetchall()
+        for (job_id,) in rows:
+            self.schedule(job_id)
+
+    def schedule(self, job_id):
+        with self.lock:
+            if job_id in self.pending:
+                return
+            self.pending.add(job_id)
+        self.pool.submit(self.run, job_id)
+
+    def heartbeat(self):
+        # Keeps this queue's running jobs fresh, and takes over the jobs of
+        # queues that have died.
+        while True:
+            time.sleep(HEARTBEAT)
+            with self.lock:
+                self.db.execute(
+                    "UPDATE jobs SET updated_at = ? WHERE owner = ? AND status = 'running'", (time.time(), self.owner)
+                )
+                self.db.commit()
+            if self.handlers:
+                self.resume(list(self.handlers))
+
+    def submit(self, kind, payload):
+        job_id = uuid.uuid4().hex
+        now    = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT INTO jobs (id, kind, status, payload, created_at, updated_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+                (job_id, kind, json.dumps(payload), now, now),
+            )
+            self.db.commit()
+        self.schedule(job_id)
+        return job_id
+
+    def retry(self, job_id):
+        # Only a failed job goes back in the queue; ValueError otherwise.
+        with self.lock:
+            cur = self.db.execute(
+                "UPDATE jobs SET status = 'queued', progress = NULL, result = NULL, error = NULL, owner = NULL, "
+                "updated_at = ? WHERE id = ? AND status = 'failed'",
+                (time.time(), job_id),
+            )
+            self.db.commit()
+        if cur.rowcount != 1:
+            raise ValueError("only a failed job can be retried")
+        self.schedule(job_id)
+        return job_id
+
+    def update(self, job_id, **fields):
+        # A queue only writes to jobs it owns, so one that lost a job to a
+        # takeover can't overwrite the new owner's progress.
+        cols = ", ".join(f"{k} = ?" for k in fields)
+        with self.lock:
+            self.db.execute(
+                f"UPDATE jobs SET {cols}, updated_at = ? WHERE id = ? AND owner = ?",
+                (*fields.values(), time.time(), job_id, self.owner),
+            )
+            self.db.commit()
+
+    def claim(self, job_id):
+        with self.lock:
+            cur = self.db.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, updated_at = ? "
+                "WHERE id = ? AND (status = 'queued' OR (status = 'running' AND updated_at < ?))",
+                (self.owner, time.time(), job_id, time.time() - STALE),
+            )
+            self.db.commit()
+        return cur.rowcount == 1
+
+    def run(self, job_id):
+        try:
+            if not self.claim(job_id):
+                return
+            job = self.get(job_id)
+            try:
+                result = self.handlers[job["kind"]](
+                    job["payload"], lambda progress: self.update(job_id, progress=json.dumps(progress))
+                )
+            except Exception as e:
+                self.update(job_id, status="failed", error=f"{type(e).__name__}: {e}")
+            else:
+                self.update(job_id, status="done", result=json.dumps(result))
+        finally:
+            with self.lock:
+                self.pending.discard(job_id)
+
+    def get(self, job_id):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT kind, status, payload, progress, result, error FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if not row:
+            return None
+        kind, status, payload, progress, result, error = row
+        return {
+            "id":       job_id,
+            "kind":     kind,
+            "status":   status,
+            "payload":  json.loads(payload),
+            "progress": json.loads(progress) if progress else None,
+            "result":   json.loads(result) if result else None,
+            "error":    error,
+        }
@@ -0,0 +1,231 @@
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ─────────────────────────────────────────────────────────────
+# LLM STUB SERVER
+#   A local stand-in for Groq's OpenAI-compatible /openai/v1 API with
+#   configurable latency, token rate and failure injection. Replies are
+#   shaped by the prompt, so question generation, grading and AyA all run
+#   their real parsing code against it. Used by bench.py; point the app at
+#   it by hand with  GROQ_BASE_URL = "http://127.0.0.1:<port>"  in secrets.
+# ─────────────────────────────────────────────────────────────
+MODELS = ["llama-3.3-70b-versatile", "llama-3.1-8b-instant", "mixtral-8x7b-32768"]
+
+WORDS = """
+acid base salt ion bond atom mole gas lens ray mirror force mass charge field
+cell gene enzyme tissue organ current voltage resistor wave sound energy work
+power heat metal oxide carbon orbital nucleus electron proton isomer polymer
+reflex hormone neuron osmosis diffusion friction torque inertia momentum
+""".split()
+
+PROSE = (
+    "Let's break this down step by step. First identify what is given and what is asked. "
+    "Then apply the relevant law and substitute the values carefully, keeping track of units. "
+    "**ANSWER:** the result follows directly once the formula is applied. "
+    "Quick check: the units and the order of magnitude both make sense."
+)
+
+
+class StubConfig:
+    def __init__(self, latency=0.3, tokens_per_sec=200.0, fail_rate=0.0, fail_status=500, seed=0):
+        self.latency        = latency          # seconds before the first byte
+        self.tokens_per_sec = tokens_per_sec   # 0 streams as fast as possible
+        self.fail_rate      = fail_rate        # share of completions that error
+        self.fail_status    = fail_status      # 500, 503 or 429
+        self.rng            = random.Random(seed)
+        self.lock           = threading.Lock()
+        self.events         = []               # per-completion timing, read by bench.py
+
+    def should_fail(self):
+        with self.lock:
+            return self.rng.random() < self.fail_rate
+
+    def record(self, event):
+        with self.lock:
+            self.events.append(event)
+
+
+def tokens(text):
+    # Word-ish pieces with their trailing whitespace, so streamed deltas
+    # join back into the original text.
+    return re.findall(r"\S+\s*", text)
+
+
+def mcq(n, offset, rng):
+    questions = []
+    for i in range(1, n + 1):
+        topic   = " ".join(rng.sample(WORDS, 4))
+        options = [f"{w} {offset + i}" for w in rng.sample(WORDS, 4)]
+        questions.append({
+            "id": i,
+            "question": f"Which statement about {topic} holds in case {offset + i}?",
+            "options": options,
+            "correct_answer": options[0],
+            "explanation": f"{options[0]} follows from the definition.",
+            "distractors": {o: f"{o} confuses two related ideas." for o in options[1:]},
+        })
+    return questions
+
+
+def descriptive(n, offset, rng):
+    return [
+        {"id": i, "question": f"Explain {' '.join(rng.sample(WORDS, 4))} with an example ({offset + i}).", "marks": 3}
+        for i in range(1, n + 1)
+    ]
+
+
+def reply_for(prompt, rng):
+    count  = re.search(r"exactly (\d+)", prompt)
+    part   = re.search(r"part (\d+) of", prompt)
+    offset = (int(part.group(1)) - 1) * 100 if part else 0
+    if count and "Multiple Choice" in prompt:
+        return json.dumps(mcq(int(count.group(1)), offset, rng))
+    if count and "Descriptive" in prompt:
+        return json.dumps(descriptive(int(count.group(1)), offset, rng))
+    if "awarded_marks" in prompt:
+        marks = re.search(r"\((\d+(?:\.\d+)?) marks\)", prompt)
+        top   = float(marks.group(1)) if marks else 1.0
+        return json.dumps({
+            "awarded_marks": round(rng.uniform(0, top)),
+            "justification": "Covers the main idea but skips one step.",
+            "missing_keywords": [rng.choice(WORDS)],
+        })
+    return PROSE
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config = None   # set by make_server
+
+    def log_message(self, *args):
+        pass
+
+    def send_json(self, obj, status=200):
+        data = json.dumps(obj).encode("utf-8")
+        self.send_response(status)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/openai/v1/models"):
+            return self.send_json({"object": "list", "data": [
+                {"id": m, "object": "model", "created": 0, "owned_by": "stub"} for m in MODELS
+            ]})
+        self.send_json({"error": {"message": "not found"}}, 404)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/openai/v1/chat/completions"):
+            return self.send_json({"error": {"message": "not found"}}, 404)
+        body    = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))))
+        cfg     = self.config
+        prompt  = body["messages"][-1]["content"]
+        started = time.time()
+        time.sleep(cfg.latency)
+
+        if cfg.should_fail():
+            cfg.record({"model": body["model"], "prompt": prompt, "start": started, "first_token": None, "end": time.time(), "ok": False})
+            if cfg.fail_status == 429:
+                self.send_response(429)
+                self.send_header("retry-after", "1")
+                self.send_header("content-type", "application/json")
+                data = json.dumps({"error": {"message": "rate limited", "type": "rate_limit_exceeded"}}).encode("utf-8")
+                self.send_header("content-length", str(len(data)))
+                self.end_headers()
+                return self.wfile.write(data)
+            return self.send_json({"error": {"message": "injected failure"}}, cfg.fail_status)
+
+        with cfg.lock:
+            pieces = tokens(reply_for(prompt, cfg.rng))
+        delay = 1.0 / cfg.tokens_per_sec if cfg.tokens_per_sec else 0.0
+        usage = {"prompt_tokens": len(tokens(json.dumps(body["messages"]))), "completion_tokens": len(pieces)}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+        if body.get("stream"):
+            first_token = self.stream(body["model"], pieces, delay)
+        else:
+            time.sleep(delay * len(pieces))
+            first_token = time.time()
+            self.send_json({
+                "id": "stub", "object": "chat.completion", "created": int(started), "model": body["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(pieces)}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+        cfg.record({"model": body["model"], "prompt": prompt, "start": started, "first_token": first_token, "end": time.time(), "ok": True})
+
+    def stream(self, model, pieces, delay):
+        self.send_response(200)
+        self.send_header("content-type", "text/event-stream")
+        self.send_header("transfer-encoding", "chunked")
+        self.end_headers()
+
+        def send(data):
+            event = f"data: {data}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(event):x}\r\n".encode("ascii") + event + b"\r\n")
+            self.wfile.flush()
+
+        def chunk(delta, finish=None):
+            return json.dumps({
+                "id": "stub", "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            })
+
+        first_token = None
+        try:
+            for piece in pieces:
+                send(chunk({"content": piece}))
+                first_token = first_token or time.time()
+                time.sleep(delay)
+            send(chunk({}, "stop"))
+            send("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+        except ConnectionError:
+            pass   # the client closed the stream, e.g. a hedged loser
+        return first_token
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients hanging up early (hedged losers, timeouts) are expected.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def make_server(config, host="127.0.0.1", port=0):
+    handler = type("Handler", (StubHandler,), {"config": config})
+    server  = StubServer((host, port), handler)
+    return server
+
+
+def start_server(config, host="127.0.0.1", port=0):
+    server = make_server(config, host, port)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible stand-in for the Groq API.")
+    parser.add_argument("--host",           default="127.0.0.1")
+    parser.add_argument("--port",           type=int,   default=8081)
+    parser.add_argument("--latency",        type=float, default=0.3)
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0)
+    parser.add_argument("--fail-rate",      type=float, default=0.0)
+    parser.add_argument("--fail-status",    type=int,   default=500)
+    args = parser.parse_args()
+
+    config = StubConfig(args.latency, args.tokens_per_sec, args.fail_rate, args.fail_status)
+    server = make_server(config, args.host, args.port)
+    print(f"LLM stub listening on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,210 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+
+# ─────────────────────────────────────────────────────────────
+# METRICS
+#   Timing for every LLM call, full script rerun and PDF extraction. Each
+#   event is appended to a JSONL log for offline analysis, and running
+#   totals are rendered in the Prometheus text format to a file that a
+#   node_exporter textfile collector (or any scraper) can pick up.
+# ─────────────────────────────────────────────────────────────
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HELP = {
+    "tmm_llm_calls_total":          ("counter",   "LLM completion calls by kind, model and outcome."),
+    "tmm_llm_latency_seconds":      ("histogram", "Wall time of an LLM call, through the last token."),
+    "tmm_llm_ttft_seconds":         ("histogram", "Time to the first streamed token."),
+    "tmm_llm_tokens_total":         ("counter",   "Prompt and completion tokens, as reported or estimated."),
+    "tmm_llm_retries_total":        ("counter",   "Calls that were a re-ask of an earlier short or failed call."),
+    "tmm_llm_fallback_hops_total":  ("counter",   "Calls made to a fallback model rather than the first choice."),
+    "tmm_rerun_seconds":            ("histogram", "Wall time of a full script rerun that ran to the end."),
+    "tmm_pdf_extract_seconds":      ("histogram", "Wall time to read an uploaded PDF, cache hits included."),
+    "tmm_pdf_pages_total":          ("counter",   "PDF pages read, by whether the document was cached."),
+}
+
+
+def usage_of(response):
+    # (prompt_tokens, completion_tokens) from an OpenAI-style response or a
+    # final stream chunk; Groq streams report it under x_groq.
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        x_groq = getattr(response, "x_groq", None)
+        usage  = x_groq.get("usage") if isinstance(x_groq, dict) else getattr(x_groq, "usage", None)
+    if usage is None:
+        return None
+    if isinstance(usage, dict):
+        return usage.get("prompt_tokens"), usage.get("completion_tokens")
+    return getattr(usage, "prompt_tokens", None), getattr(usage, "completion_tokens", None)
+
+
+def label_text(labels):
+    if not labels:
+        return ""
+    escape = lambda v: str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{k}="{escape(v)}"' for k, v in labels) + "}"
+
+
+class CallTimer:
+    # Times one completion call. call() runs the SDK method: plain responses
+    # are finished straight away, streams come back wrapped so the first
+    # token, usage and end of stream are seen as the caller iterates.
+    def __init__(self, metrics, kind, model, fields):
+        self.metrics  = metrics
+        self.kind     = kind
+        self.model    = model or ""
+        self.fields   = fields
+        self.started  = time.perf_counter()
+        self.ttft     = None
+        self.usage    = None
+        self.chars    = 0
+        self.finished = False
+
+    def call(self, create, **kwargs):
+        try:
+            result = create(**kwargs)
+        except Exception as e:
+            self.finish(error=e)
+            raise
+        if kwargs.get("stream"):
+            return self.observe(result)
+        self.usage = usage_of(result)
+        self.finish()
+        return result
+
+    def observe(self, chunks):
+        try:
+            for chunk in chunks:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if self.ttft is None:
+                        self.ttft = time.perf_counter() - self.started
+                    self.chars += len(chunk.choices[0].delta.content)
+                self.usage = usage_of(chunk) or self.usage
+                yield chunk
+        except GeneratorExit:
+            self.finish(outcome="cancelled")
+            raise
+        except Exception as e:
+            self.finish(error=e)
+            raise
+        finally:
+            if hasattr(chunks, "close"):
+                chunks.close()
+        self.finish()
+
+    def finish(self, error=None, outcome=None):
+        if self.finished:
+            return
+        self.finished = True
+        prompt_tokens, completion_tokens = self.usage or (None, None)
+        event = {
+            "model":             self.model,
+            "outcome":           outcome or ("error" if error else "ok"),
+            "latency":           round(time.perf_counter() - self.started, 4),
+            "ttft":              None if self.ttft is None else round(self.ttft, 4),
+            "prompt_tokens":     prompt_tokens,
+            # ~4 characters per token when a stream ends without usage
+            "completion_tokens": completion_tokens if completion_tokens is not None else (self.chars + 3) // 4 or None,
+            **self.fields,
+        }
+        if error is not None:
+            event["error"] = f"{type(error).__name__}: {error}"[:300]
+        self.metrics.record(self.kind, **event)
+
+
+class Metrics:
+    def __init__(self, jsonl_path, prom_path, flush_interval=15.0, max_jsonl_bytes=50 * 1024 * 1024):
+        self.jsonl_path      = jsonl_path
+        self.prom_path       = prom_path
+        self.flush_interval  = flush_interval
+        self.max_jsonl_bytes = max_jsonl_bytes
+        self.counters        = defaultdict(float)   # (name, labels) -> value
+        self.histograms      = {}                   # (name, labels) -> [bucket counts..., sum, count]
+        self.last_flush      = 0.0
+        self.lock            = threading.Lock()
+        for path in (jsonl_path, prom_path):
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def timer(self, kind, model, **fields):
+        return CallTimer(self, kind, model, fields)
+
+    def record(self, kind, **fields):
+        event = {"ts": round(time.time(), 3), "kind": kind, **fields}
+        line  = json.dumps(event, default=str) + "\n"
+        with self.lock:
+            self.append(line)
+            self.aggregate(event)
+            if time.monotonic() - self.last_flush >= self.flush_interval:
+                self.flush()
+
+    def append(self, line):
+        try:
+            if os.path.getsize(self.jsonl_path) > self.max_jsonl_bytes:
+                os.replace(self.jsonl_path, self.jsonl_path + ".1")
+        except OSError:
+            pass
+        with open(self.jsonl_path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+    def aggregate(self, e):
+        kind = e["kind"]
+        if kind == "rerun":
+            self.observe("tmm_rerun_seconds", (("tab", e.get("tab", "")),), e["latency"])
+        elif kind == "pdf":
+            cached = (("cached", str(bool(e.get("cached"))).lower()),)
+            self.observe("tmm_pdf_extract_seconds", cached, e["latency"])
+            self.counters[("tmm_pdf_pages_total", cached)] += e.get("pages", 0)
+        else:
+            labels = (("kind", kind), ("model", e.get("model", "")))
+            self.counters[("tmm_llm_calls_total", labels + (("outcome", e["outcome"]),))] += 1
+            self.observe("tmm_llm_latency_seconds", labels, e["latency"])
+            if e.get("ttft") is not None:
+                self.observe("tmm_llm_ttft_seconds", labels, e["ttft"])
+            for side in ("prompt", "completion"):
+                if e.get(f"{side}_tokens"):
+                    self.counters[("tmm_llm_tokens_total", labels + (("type", side),))] += e[f"{side}_tokens"]
+            if e.get("retry"):
+                self.counters[("tmm_llm_retries_total", labels)] += 1
+            if e.get("hop"):
+                self.counters[("tmm_llm_fallback_hops_total", labels)] += 1
+
+    def observe(self, name, labels, value):
+        h = self.histograms.setdefault((name, labels), [0] * (len(LATENCY_BUCKETS) + 2))
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                h[i] += 1
+        h[-2] += value
+        h[-1] += 1
+
+    def render(self):
+        lines, typed = [], set()
+
+        def header(name):
+            if name not in typed:
+                typed.add(name)
+                kind, text = HELP[name]
+                lines.extend([f"# HELP {name} {text}", f"# TYPE {name} {kind}"])
+
+        for (name, labels), value in sorted(self.counters.items()):
+            header(name)
+            lines.append(f"{name}{label_text(labels)} {value:g}")
+        for (name, labels), h in sorted(self.histograms.items()):
+            header(name)
+            for bound, count in zip(LATENCY_BUCKETS, h):
+                lines.append(f"{name}_bucket{label_text(labels + (('le', f'{bound:g}'),))} {count}")
+            lines.append(f"{name}_bucket{label_text(labels + (('le', '+Inf'),))} {h[-1]}")
+            lines.append(f"{name}_sum{label_text(labels)} {h[-2]:.4f}")
+            lines.append(f"{name}_count{label_text(labels)} {h[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        # Called with the lock held; replaced atomically so a scraper never
+        # reads half a file.
+        tmp = self.prom_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.render())
+        os.replace(tmp, self.prom_path)
+        self.last_flush = time.monotonic()
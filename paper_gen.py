@@ -0,0 +1,219 @@
+import json
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+# ─────────────────────────────────────────────────────────────
+# PAPER GENERATION
+#   Prompting, streaming and checking of mock test papers, shared by the
+#   Mock Test tab and the warm-up worker (warmup.py) so both fill the
+#   question bank with papers built and vetted the same way.
+# ─────────────────────────────────────────────────────────────
+CHUNK_SIZE      = 5     # questions per sub-request when a paper is split
+CHUNK_RETRIES   = 2     # extra rounds that re-ask short chunks for their shortfall
+DUP_THRESHOLD   = 0.8   # word-set Jaccard at which two questions count as the same
+QUESTION_TOKENS = 150   # typical output per question, charged against the TPM budget
+AVOID_LIMIT     = 10    # rejected repeats quoted back to the model when re-asking
+MAX_QUESTIONS   = 20    # largest paper the Mock Test tab offers
+DIFFICULTIES    = ["Easy", "Medium", "Hard"]
+Q_TYPES         = ["MCQ", "Descriptive"]
+
+
+def clean_input(text):
+    if not text: return ""
+    return text.encode("ascii", "ignore").decode("ascii").strip()
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 4
+
+
+def delta_text(chunk):
+    if not chunk.choices:
+        return ""
+    return chunk.choices[0].delta.content or ""
+
+
+def paper_context(board, cls, subject, chapter):
+    return (
+        f"You are a strict Textbook Author and Examiner for the {board} Board. "
+        f"Subject: {subject}, Class: {cls}, Chapter: '{chapter}'.\n"
+        f"RULES: Questions must be factually 100% correct per standard {board} textbooks. "
+        f"No ambiguous questions. Exactly one indisputable correct answer."
+    )
+
+
+def question_prompt(context, num, difficulty, q_type, part=None, avoid=()):
+    if part:
+        context += (
+            f"\nThis is part {part[0]} of {part[1]} of one paper, written independently. "
+            f"Draw these questions from sub-topic group {part[0]} of {part[1]} of the chapter "
+            f"(in textbook order) so they do not overlap with the other parts."
+        )
+    if avoid:
+        context += "\nThese questions have already been used; ask about something else:\n" + "\n".join(
+            f"- {text}" for text in avoid
+        )
+
+    if q_type == "MCQ":
+        return f"""{context}
+Create a valid JSON list of exactly {num} {difficulty}-level Multiple Choice Questions.
+
+Format:
+[
+  {{"id": 1, "question": "...", "options": ["A", "B", "C", "D"], "correct_answer": "A",
+    "explanation": "why A is correct",
+    "distractors": {{"B": "why B is wrong", "C": "why C is wrong", "D": "why D is wrong"}}}}
+]
+Verify: correct_answer must match one option exactly and be factually correct.
+distractors must have one short explanation for every wrong option, keyed by its exact text.
+Return ONLY raw JSON. No explanation. No markdown fences."""
+    return f"""{context}
+Create a valid JSON list of exactly {num} {difficulty}-level Descriptive Questions with marks.
+
+Format:
+[
+  {{"id": 1, "question": "...", "marks": 3}}
+]
+Return ONLY raw JSON. No explanation. No markdown fences."""
+
+
+def iter_json_objects(pieces):
+    # Incremental scanner over streamed text: yields each top-level {...}
+    # as soon as its closing brace arrives. Fences, the enclosing [ ] and
+    # any chatter are skipped, and a truncated trailing object is dropped.
+    depth, in_str, escape, obj = 0, False, False, []
+    for piece in pieces:
+        for ch in piece:
+            if depth == 0:
+                if ch == "{":
+                    depth, obj = 1, ["{"]
+                continue
+            obj.append(ch)
+            if in_str:
+                if escape:
+                    escape = False
+                elif ch == "\\":
+                    escape = True
+                elif ch == '"':
+                    in_str = False
+            elif ch == '"':
+                in_str = True
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+                if depth == 0:
+                    try:
+                        yield json.loads("".join(obj))
+                    except ValueError:
+                        pass
+
+
+def stream_questions(client, model, prompt, metrics, retry=0, scheduler=None, priority="generate", tokens=0):
+    def create():
+        return metrics.timer("generate", model, retry=retry).call(
+            client.chat.completions.create,
+            model=model,
+            messages=[
+                {"role": "system", "content": "You are a precise academic assistant. Output strictly valid JSON only."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.1,
+            stream=True,
+        )
+    stream = scheduler.requeue(create, priority, tokens) if scheduler else create()
+    yield from iter_json_objects(delta_text(chunk) for chunk in stream)
+
+
+def valid_question(q, q_type):
+    if not isinstance(q, dict) or not str(q.get("question", "")).strip():
+        return False
+    if q_type == "MCQ":
+        return isinstance(q.get("options"), list) and q.get("correct_answer") in q["options"]
+    return isinstance(q.get("marks", 1), (int, float))
+
+
+def question_words(q):
+    text = str(q.get("question", "")).casefold()
+    return frozenset("".join(c if c.isalnum() else " " for c in text).split())
+
+
+def paper_problems(questions, num, q_type):
+    # Reasons a finished paper shouldn't go into the shared bank; empty when
+    # it is complete and every question is well formed.
+    problems = []
+    if len(questions) != num:
+        problems.append(f"{len(questions)} of {num} questions")
+    for q in questions:
+        label = f"Q{q.get('id', '?')}"
+        if not valid_question(q, q_type):
+            problems.append(f"{label}: malformed")
+        elif q_type == "MCQ":
+            options = [str(o).strip() for o in q["options"]]
+            if len(options) < 2 or len(set(options)) != len(options) or not all(options):
+                problems.append(f"{label}: blank or repeated options")
+        elif q.get("marks", 1) <= 0:
+            problems.append(f"{label}: no marks")
+    return problems
+
+
+def pump_chunk(client, model, prompt, index, out, metrics, retry=0, scheduler=None, priority="generate", tokens=0):
+    try:
+        for q in stream_questions(client, model, prompt, metrics, retry, scheduler, priority, tokens):
+            out.put((index, q))
+    except Exception:
+        pass
+    finally:
+        out.put((index, None))
+
+
+def iter_paper(client, model, context, num, difficulty, q_type, scheduler, metrics, on_wait=None, priority="generate",
+               is_repeat=None):
+    # Papers larger than CHUNK_SIZE are split into sub-requests that stream
+    # concurrently. Questions are yielded in arrival order with near-duplicates
+    # dropped and ids renumbered; chunks that fail or come up short are
+    # re-asked for just their shortfall, quoting the repeats back.
+    # is_repeat(q), if given, rejects questions that repeat earlier papers.
+    sizes = [CHUNK_SIZE] * (num // CHUNK_SIZE)
+    if num % CHUNK_SIZE:
+        sizes.append(num % CHUNK_SIZE)
+    parts    = len(sizes)
+    survived = [0] * parts
+    pending  = list(range(parts))
+    seen     = []
+    repeats  = []
+
+    pool = ThreadPoolExecutor(max_workers=parts)
+    try:
+        for retry in range(1 + CHUNK_RETRIES):
+            out = queue.Queue()
+            for i in pending:
+                part = (i + 1, parts) if parts > 1 else None
+                prompt = question_prompt(context, sizes[i] - survived[i], difficulty, q_type, part, repeats[-AVOID_LIMIT:])
+                tokens = estimate_tokens(prompt) + QUESTION_TOKENS * (sizes[i] - survived[i])
+                scheduler.acquire(priority, tokens, on_wait)
+                pool.submit(pump_chunk, client, model, prompt, i, out, metrics, retry, scheduler, priority, tokens)
+
+            running = len(pending)
+            while running:
+                i, q = out.get()
+                if q is None:
+                    running -= 1
+                    continue
+                if survived[i] >= sizes[i] or not valid_question(q, q_type):
+                    continue
+                words = question_words(q)
+                if any(len(words & w) >= DUP_THRESHOLD * len(words | w) for w in seen) or (is_repeat and is_repeat(q)):
+                    if str(q["question"]) not in repeats:
+                        repeats.append(str(q["question"]))
+                    continue
+                seen.append(words)
+                survived[i] += 1
+                q["id"] = len(seen)
+                yield q
+
+            pending = [i for i in range(parts) if survived[i] < sizes[i]]
+            if not pending:
+                break
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
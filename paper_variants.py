@@ -0,0 +1,143 @@
+import hashlib
+import itertools
+import json
+import random
+import re
+import threading
+import time
+
+from paper_gen import MAX_QUESTIONS
+from question_bank import normalize, paper_key
+
+# ─────────────────────────────────────────────────────────────
+# PAPER VARIANTS
+#   Fresh papers assembled locally from questions already in the bank:
+#   each variant samples the chapter's validated questions and shuffles
+#   their options, so students get distinct papers without a new model
+#   call. Variants are reproducible from (seed, index), and a batch never
+#   contains the same paper twice. Served variants are tracked in the bank,
+#   so replicas and restarts carry on the day's sequence, not repeat it.
+# ─────────────────────────────────────────────────────────────
+# Options that point at other options stay where they are.
+POSITIONAL = re.compile(r"\b(all|none|both|neither)\s+of\s+(the\s+)?(above|these|them)\b|^\s*both\b", re.I)
+# "A) ...", "(b) ...", "C. ..." style labels travel with the position, not the text.
+LABEL      = re.compile(r"^\s*\(?[A-Za-z][\).:]\s+")
+ATTEMPTS   = 50   # consecutive repeats before a pool counts as exhausted
+
+
+def shuffle_options(q, rng):
+    # A copy of q with its options permuted; the correct answer and the
+    # distractor notes follow their option's new text.
+    options = [str(o) for o in q["options"]]
+    labels  = [LABEL.match(o) for o in options]
+    labeled = all(labels)
+    bodies  = [o[m.end():] if labeled else o for o, m in zip(options, labels)]
+
+    movable = [i for i, body in enumerate(bodies) if not POSITIONAL.search(body)]
+    picked  = [bodies[i] for i in movable]
+    rng.shuffle(picked)
+    for i, body in zip(movable, picked):
+        bodies[i] = body
+
+    shuffled = [m.group(0) + body if labeled else body for m, body in zip(labels, bodies)]
+    new_text = {old: shuffled[bodies.index(old[m.end():] if labeled else old)] for old, m in zip(options, labels)}
+    distractors = q.get("distractors") if isinstance(q.get("distractors"), dict) else {}
+    return {
+        **q,
+        "options":        shuffled,
+        "correct_answer": new_text.get(str(q["correct_answer"]), q["correct_answer"]),
+        "distractors":    {new_text.get(k, k): v for k, v in distractors.items()},
+    }
+
+
+def variant(pool, num, seed, index):
+    rng   = random.Random(f"{seed}:{index}")
+    paper = []
+    for n, q in enumerate(rng.sample(pool, num), start=1):
+        q = shuffle_options(q, rng) if isinstance(q.get("options"), list) else dict(q)
+        q["id"] = n
+        paper.append(q)
+    return paper
+
+
+def fingerprint(paper):
+    raw = json.dumps([(q["question"], q.get("options")) for q in paper])
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).digest()
+
+
+def unique_variants(pool, num, seed, seen, start=0):
+    # (index, paper) for successive indices, skipping papers already in
+    # `seen`; stops once ATTEMPTS indices in a row come up repeats.
+    index, misses = start, 0
+    while misses < ATTEMPTS:
+        paper = variant(pool, num, seed, index)
+        index += 1
+        mark = fingerprint(paper)
+        if mark in seen:
+            misses += 1
+            continue
+        seen.add(mark)
+        misses = 0
+        yield index - 1, paper
+
+
+def batch(pool, num, count, seed):
+    # `count` distinct papers, or ValueError if the pool can't make that many.
+    papers = [paper for _, paper in itertools.islice(unique_variants(pool, num, seed, set()), count)]
+    if len(papers) < count:
+        raise ValueError(f"only {len(papers)} distinct papers of {num} can be made from {len(pool)} questions")
+    return papers
+
+
+class VariantEngine:
+    def __init__(self, bank, min_ratio=3.0, refresh=60.0):
+        self.bank      = bank
+        self.min_ratio = min_ratio   # pool must hold this many times the paper size
+        self.refresh   = refresh
+        self.pools     = {}          # pool key -> (questions, loaded at)
+        self.stats     = {"served": 0, "too_small": 0}
+        self.lock      = threading.Lock()
+
+    def pool(self, board, cls, subject, chapter, difficulty, q_type):
+        # Every distinct question in the bank for these settings, whatever
+        # the size of the paper it came from.
+        key = paper_key(board, cls, subject, chapter, difficulty, q_type, 0)
+        now = time.monotonic()
+        with self.lock:
+            cached = self.pools.get(key)
+        if cached and now - cached[1] < self.refresh:
+            return key, cached[0]
+
+        keys      = [paper_key(board, cls, subject, chapter, difficulty, q_type, n) for n in range(1, MAX_QUESTIONS + 1)]
+        questions = {}
+        for q in self.bank.questions(keys):
+            questions.setdefault(normalize(q.get("question", "")), q)
+        pool = list(questions.values())
+        with self.lock:
+            self.pools[key] = (pool, now)
+        return key, pool
+
+    def next_paper(self, board, cls, subject, chapter, difficulty, q_type, num):
+        # The day's next unseen variant for these settings, or None when the
+        # bank doesn't hold enough questions yet.
+        key, pool = self.pool(board, cls, subject, chapter, difficulty, q_type)
+        if len(pool) < max(num, self.min_ratio * num):
+            # Not kept: a chapter the bank is still filling is re-read on the
+            # next request instead of `refresh` seconds later.
+            with self.lock:
+                self.pools.pop(key, None)
+                self.stats["too_small"] += 1
+            return None
+        day  = time.strftime("%Y-%m-%d")
+        seed = f"{key}:{num}:{day}"
+
+        def candidates(start):
+            for index in range(start, start + ATTEMPTS):
+                paper = variant(pool, num, seed, index)
+                yield index, fingerprint(paper), paper
+
+        paper = self.bank.take_variant(seed, day, candidates)
+        if paper:
+            with self.lock:
+                self.stats["served"] += 1
+        return paper
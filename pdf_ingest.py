@@ -0,0 +1,152 @@
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import PyPDF2
+
+# ─────────────────────────────────────────────────────────────
+# PDF INGESTION
+#   Whole-document text extraction spread over a process pool, cached by
+#   file hash in memory and on disk, and split into numbered problems so a
+#   student can point AyA at one question without re-reading the file.
+#   Workers get the upload as a temporary file rather than pickled bytes,
+#   and each parses a document once however many batches it runs.
+# ─────────────────────────────────────────────────────────────
+PAGES_PER_TASK = 4
+READER         = None   # (hash, PdfReader) of the document this worker last parsed
+
+# "Q3", "Q.3", "Question 3", "3." or "3)" at the start of a line
+PROBLEM_START = re.compile(
+    r"^[ \t]*(?:Q(?:uestion)?[ \t]*\.?[ \t]*(\d{1,3})[ \t]*[.):]?|(\d{1,3})[ \t]*[.)])[ \t]+(?=\S)",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+def file_hash(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def extract_pages(path, digest, start, stop):
+    # Runs inside a worker process, so it has to stay a top-level function.
+    global READER
+    if READER is None or READER[0] != digest:
+        READER = (digest, PyPDF2.PdfReader(path))
+    reader = READER[1]
+    texts  = []
+    for i in range(start, stop):
+        try:
+            texts.append(reader.pages[i].extract_text() or "")
+        except Exception:
+            texts.append("")
+    return start, texts
+
+
+def numbered_starts(text, group):
+    # Positions of a run of markers counting up from 1, so list items inside
+    # a question don't split it.
+    starts, expected = [], 1
+    for m in PROBLEM_START.finditer(text):
+        if m.group(group) and int(m.group(group)) == expected:
+            starts.append((expected, m.start()))
+            expected += 1
+    return starts
+
+
+def split_problems(pages):
+    offsets, text = [], ""
+    for page in pages:
+        offsets.append(len(text))
+        text += page + "\n"
+
+    # Explicit "Q"/"Question" markers win over bare "3." numbering when a
+    # paper uses them, since sub-parts are usually numbered bare.
+    starts = numbered_starts(text, 1)
+    if len(starts) < 2:
+        starts = numbered_starts(text, 2)
+
+    problems = []
+    for i, (num, pos) in enumerate(starts):
+        end  = starts[i + 1][1] if i + 1 < len(starts) else len(text)
+        page = sum(1 for off in offsets if off <= pos)
+        body = text[pos:end].strip()
+        if body:
+            problems.append({"label": f"Q{num}", "page": page, "text": body})
+    return problems
+
+
+class PdfIngestor:
+    def __init__(self, cache_dir, workers=None, memory_items=32):
+        self.cache_dir    = cache_dir
+        self.memory_items = memory_items
+        self.memory       = OrderedDict()
+        self.lock         = threading.Lock()
+        # spawn: safe to start from Streamlit's threaded server and on Windows
+        self.pool = ProcessPoolExecutor(
+            max_workers=workers or min(4, os.cpu_count() or 1),
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def cache_path(self, digest):
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def get(self, digest):
+        with self.lock:
+            if digest in self.memory:
+                self.memory.move_to_end(digest)
+                return self.memory[digest]
+        try:
+            with open(self.cache_path(digest), encoding="utf-8") as f:
+                doc = json.load(f)
+        except (OSError, ValueError):
+            return None
+        self.remember(doc)
+        return doc
+
+    def remember(self, doc):
+        with self.lock:
+            self.memory[doc["hash"]] = doc
+            self.memory.move_to_end(doc["hash"])
+            while len(self.memory) > self.memory_items:
+                self.memory.popitem(last=False)
+
+    def ingest(self, data, progress=None):
+        # progress(done_pages, total_pages) is called as batches finish.
+        digest = file_hash(data)
+        doc = self.get(digest)
+        if doc:
+            return doc
+
+        total = len(PyPDF2.PdfReader(io.BytesIO(data)).pages)
+        pages = [""] * total
+        with tempfile.NamedTemporaryFile(dir=self.cache_dir, suffix=".pdf", delete=False) as f:
+            f.write(data)
+        try:
+            futures = [
+                self.pool.submit(extract_pages, f.name, digest, start, min(start + PAGES_PER_TASK, total))
+                for start in range(0, total, PAGES_PER_TASK)
+            ]
+            done = 0
+            for fut in as_completed(futures):
+                start, texts = fut.result()
+                pages[start:start + len(texts)] = texts
+                done += len(texts)
+                if progress:
+                    progress(done, total)
+        finally:
+            os.remove(f.name)
+
+        doc = {"hash": digest, "pages": pages, "problems": split_problems(pages)}
+        tmp = self.cache_path(digest) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(doc, f)
+        os.replace(tmp, self.cache_path(digest))
+        self.remember(doc)
+        return doc
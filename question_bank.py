@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+
+# ─────────────────────────────────────────────────────────────
+# QUESTION BANK
+#   Content-addressed store of generated papers. Each paper key keeps a
+#   small pool of distinct papers so students sharing the same settings
+#   still get variety; once the pool is full, requests are served from it.
+#   The bank also keeps the day's paper-variant sequences (paper_variants.py),
+#   so every process sharing it hands out a given variant only once.
+# ─────────────────────────────────────────────────────────────
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    paper_key   TEXT    NOT NULL,
+    questions   TEXT    NOT NULL,
+    created_at  REAL    NOT NULL,
+    last_used   REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_papers_key       ON papers(paper_key, created_at);
+CREATE INDEX IF NOT EXISTS idx_papers_last_used ON papers(last_used);
+CREATE TABLE IF NOT EXISTS variant_sequences (
+    sequence    TEXT    PRIMARY KEY,   -- pool key, paper size and day
+    day         TEXT    NOT NULL,
+    next_index  INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS variant_served (
+    sequence    TEXT    NOT NULL,
+    day         TEXT    NOT NULL,
+    fingerprint BLOB    NOT NULL,
+    PRIMARY KEY (sequence, fingerprint)
+);
+"""
+
+
+def normalize(value):
+    return " ".join(str(value).split()).casefold()
+
+
+def paper_key(board, cls, subject, chapter, difficulty, q_type, num):
+    parts = [board, cls, subject, chapter, difficulty, q_type, int(num)]
+    raw = json.dumps([normalize(p) for p in parts])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class QuestionBank:
+    def __init__(self, path, pool_size=5, ttl=7 * 24 * 3600, max_papers=5000):
+        self.pool_size  = pool_size
+        self.ttl        = ttl
+        self.max_papers = max_papers
+        self.lock       = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+
+    def draw(self, key):
+        # A random fresh paper once the pool for this key is full, else None
+        # so the caller generates a new one and grows the pool.
+        now = time.time()
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT id, questions FROM papers WHERE paper_key = ? AND created_at >= ?",
+                (key, now - self.ttl),
+            ).fetchall()
+            if len(rows) < self.pool_size:
+                return None
+            paper_id, questions = random.choice(rows)
+            self.db.execute("UPDATE papers SET last_used = ? WHERE id = ?", (now, paper_id))
+            self.db.commit()
+        return json.loads(questions)
+
+    def fresh(self, key):
+        # Papers for this key that draw() can still serve.
+        with self.lock:
+            (count,) = self.db.execute(
+                "SELECT COUNT(*) FROM papers WHERE paper_key = ? AND created_at >= ?",
+                (key, time.time() - self.ttl),
+            ).fetchone()
+        return count
+
+    def questions(self, keys):
+        # Every question of every fresh paper under any of `keys`.
+        marks = ", ".join("?" * len(keys))
+        with self.lock:
+            rows = self.db.execute(
+                f"SELECT questions FROM papers WHERE paper_key IN ({marks}) AND created_at >= ?",
+                (*keys, time.time() - self.ttl),
+            ).fetchall()
+        return [q for (questions,) in rows for q in json.loads(questions)]
+
+    def take_variant(self, sequence, day, candidates):
+        # The first of candidates(start) -- (index, fingerprint, paper) from
+        # the sequence's stored position on -- not yet served under
+        # `sequence`, or None. Position and fingerprint are taken in one
+        # write transaction, so concurrent processes never get the same one.
+        with self.lock:
+            self.db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.db.execute(
+                    "SELECT next_index FROM variant_sequences WHERE sequence = ?", (sequence,)
+                ).fetchone()
+                if not row:
+                    self.db.execute("DELETE FROM variant_sequences WHERE day <> ?", (day,))
+                    self.db.execute("DELETE FROM variant_served WHERE day <> ?", (day,))
+                taken = None
+                for index, mark, paper in candidates(row[0] if row else 0):
+                    cur = self.db.execute(
+                        "INSERT OR IGNORE INTO variant_served (sequence, day, fingerprint) VALUES (?, ?, ?)",
+                        (sequence, day, mark),
+                    )
+                    if cur.rowcount == 1:
+                        taken = paper
+                        self.db.execute(
+                            "INSERT INTO variant_sequences (sequence, day, next_index) VALUES (?, ?, ?) "
+                            "ON CONFLICT(sequence) DO UPDATE SET next_index = excluded.next_index",
+                            (sequence, day, index + 1),
+                        )
+                        break
+                self.db.commit()
+            except BaseException:
+                self.db.rollback()
+                raise
+        return taken
+
+    def add(self, key, questions):
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT INTO papers (paper_key, questions, created_at, last_used) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(questions), now, now),
+            )
+            self.evict(now)
+            self.db.commit()
+
+    def evict(self, now):
+        self.db.execute("DELETE FROM papers WHERE created_at < ?", (now - self.ttl,))
+        self.db.execute(
+            "DELETE FROM papers WHERE id IN ("
+            "  SELECT id FROM papers ORDER BY last_used DESC LIMIT -1 OFFSET ?"
+            ")",
+            (self.max_papers,),
+        )
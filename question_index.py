@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from question_bank import normalize
+from retrieval import tokenize
+
+# ─────────────────────────────────────────────────────────────
+# QUESTION INDEX
+#   Near-duplicate detection across every question generated for a
+#   chapter. Questions are shingled into word unigrams and bigrams, reduced
+#   to MinHash signatures and bucketed by LSH bands, so a lookup compares
+#   against a handful of candidates rather than the whole chapter.
+#   Generation only reads the index; a paper's questions are recorded in
+#   one go once the paper is kept.
+#   Partitions (board/class/subject/chapter) are loaded from SQLite on
+#   first use and topped up with rows written since, including by other
+#   processes such as the warm-up worker.
+# ─────────────────────────────────────────────────────────────
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    part        TEXT    NOT NULL,
+    question    TEXT    NOT NULL,
+    signature   BLOB    NOT NULL,
+    created_at  REAL    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_questions_part ON questions(part, id);
+"""
+
+NUM_PERM = 128   # MinHash permutations; 512 bytes per question
+BANDS    = 32    # of 4 rows each: pairs from ~0.45 Jaccard up are usually candidates
+ROWS     = NUM_PERM // BANDS
+PRIME    = 4294967291   # largest prime below 2**32, so signatures fit in uint32
+
+# Fixed seed: persisted signatures are only comparable under the same
+# permutations.
+PERM_A, PERM_B = np.random.default_rng(20240601).integers(1, PRIME, (2, NUM_PERM), dtype=np.uint64)
+
+
+def partition_key(board, cls, subject, chapter):
+    raw = json.dumps([normalize(p) for p in (board, cls, subject, chapter)])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def shingles(text):
+    words = tokenize(text)
+    return set(words) | {f"{a} {b}" for a, b in zip(words, words[1:])}
+
+
+def signature(text):
+    # None when the text has nothing left to compare once stopwords go.
+    grams = shingles(text)
+    if not grams:
+        return None
+    x = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+    return ((PERM_A[:, None] * x[None, :] + PERM_B[:, None]) % PRIME).min(axis=1).astype(np.uint32)
+
+
+class Partition:
+    def __init__(self):
+        self.sigs    = {}                           # row id -> signature
+        self.buckets = [{} for _ in range(BANDS)]   # band hash -> [row ids]
+        self.last_id = 0                            # highest row id read from disk
+        self.synced  = float("-inf")
+
+    def bands(self, sig):
+        return [sig[i * ROWS:(i + 1) * ROWS].tobytes() for i in range(BANDS)]
+
+    def add(self, row_id, sig):
+        self.sigs[row_id] = sig
+        for bucket, band in zip(self.buckets, self.bands(sig)):
+            bucket.setdefault(band, []).append(row_id)
+
+    def drop(self, row_id):
+        sig = self.sigs.pop(row_id)
+        for bucket, band in zip(self.buckets, self.bands(sig)):
+            ids = bucket[band]
+            ids.remove(row_id)
+            if not ids:
+                del bucket[band]
+
+    def similarity(self, sig):
+        # Estimated Jaccard of the closest LSH candidate, 0.0 when none.
+        candidates = set()
+        for bucket, band in zip(self.buckets, self.bands(sig)):
+            candidates.update(bucket.get(band, ()))
+        if not candidates:
+            return 0.0
+        return max(float(np.mean(self.sigs[c] == sig)) for c in candidates)
+
+
+class QuestionIndex:
+    def __init__(self, path, threshold=0.6, max_per_partition=2000, refresh=30.0):
+        self.threshold         = threshold
+        self.max_per_partition = max_per_partition
+        self.refresh           = refresh
+        self.partitions        = {}
+        self.stats             = {"checked": 0, "duplicates": 0}
+        self.lock              = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def partition(self, part):
+        # Called with the lock held. Reads only rows added since the last
+        # visit, and at most every `refresh` seconds.
+        p   = self.partitions.setdefault(part, Partition())
+        now = time.monotonic()
+        if now - p.synced < self.refresh:
+            return p
+        rows = self.db.execute(
+            "SELECT id, question, signature FROM questions WHERE part = ? AND id > ? ORDER BY id",
+            (part, p.last_id),
+        ).fetchall()
+        for row_id, question, blob in rows:
+            p.last_id = row_id
+            if row_id in p.sigs:   # our own write
+                continue
+            sig = np.frombuffer(blob, dtype=np.uint32)
+            if len(sig) != NUM_PERM:
+                sig = signature(question)
+            if sig is not None:
+                p.add(row_id, sig)
+        p.synced = now
+        return p
+
+    def is_duplicate(self, part, question):
+        # True if the question nearly repeats one recorded for this
+        # partition. Read-only: nothing is written until record().
+        sig = signature(question)
+        if sig is None:
+            return False
+        with self.lock:
+            p   = self.partition(part)
+            dup = p.similarity(sig) >= self.threshold
+            self.stats["checked"] += 1
+            self.stats["duplicates"] += dup
+        return dup
+
+    def record(self, part, questions):
+        # Adds the questions of a paper that was kept, in one transaction.
+        # Rejected papers are never recorded, so they block nothing later.
+        rows = [(q, sig) for q in questions if (sig := signature(q)) is not None]
+        if not rows:
+            return
+        now = time.time()
+        with self.lock:
+            p = self.partition(part)
+            with self.db:
+                for question, sig in rows:
+                    cur = self.db.execute(
+                        "INSERT INTO questions (part, question, signature, created_at) VALUES (?, ?, ?, ?)",
+                        (part, question, sig.tobytes(), now),
+                    )
+                    p.add(cur.lastrowid, sig)
+                if len(p.sigs) > self.max_per_partition:
+                    self.evict(part, p)
+
+    def evict(self, part, p):
+        # Oldest first; row ids grow with insertion order.
+        excess = sorted(p.sigs)[:len(p.sigs) - self.max_per_partition]
+        for row_id in excess:
+            p.drop(row_id)
+        self.db.execute("DELETE FROM questions WHERE part = ? AND id <= ?", (part, excess[-1]))
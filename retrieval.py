@@ -0,0 +1,73 @@
+import math
+import re
+from collections import Counter, defaultdict
+
+# ─────────────────────────────────────────────────────────────
+# RETRIEVAL
+#   BM25 over page-labelled chunks of an uploaded document, so each AyA
+#   turn is grounded in a few relevant excerpts instead of the whole file.
+# ─────────────────────────────────────────────────────────────
+CHUNK_WORDS   = 150
+CHUNK_OVERLAP = 30
+
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have how in is it its of on or that the
+this to was were what when where which who why will with explain find give
+""".split())
+
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    # Single letters are noise, but single digits ("Q 7", "n = 2") are not.
+    return [w for w in WORD.findall(text.casefold()) if (len(w) > 1 or w.isdigit()) and w not in STOPWORDS]
+
+
+def chunk_pages(pages, size=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    # Overlapping word windows that never cross a page, so every excerpt can
+    # be cited by page number.
+    chunks = []
+    for page_no, text in enumerate(pages, start=1):
+        words = text.split()
+        step = size - overlap
+        for start in range(0, max(len(words) - overlap, 1), step):
+            piece = " ".join(words[start:start + size])
+            if piece:
+                chunks.append({"page": page_no, "text": piece})
+    return chunks
+
+
+class Bm25Index:
+    def __init__(self, chunks, k1=1.5, b=0.75):
+        self.chunks   = chunks
+        self.k1       = k1
+        self.b        = b
+        self.postings = defaultdict(list)   # term -> [(chunk, tf)]
+        self.lengths  = []
+
+        for i, chunk in enumerate(chunks):
+            terms = tokenize(chunk["text"])
+            self.lengths.append(len(terms))
+            for term, tf in Counter(terms).items():
+                self.postings[term].append((i, tf))
+
+        n = len(chunks)
+        self.avg_len = sum(self.lengths) / n if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def search(self, query, k=4):
+        # Top-k chunks for the query, best first; chunks with no matching
+        # term are never returned.
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            for i, tf in self.postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / self.avg_len)
+                scores[i] += idf * tf * (self.k1 + 1) / (tf + norm)
+        best = sorted(scores, key=scores.get, reverse=True)[:k]
+        return [self.chunks[i] for i in best]
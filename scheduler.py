@@ -0,0 +1,186 @@
+import heapq
+import itertools
+import re
+import threading
+import time
+
+import groq
+import openai
+
+# ─────────────────────────────────────────────────────────────
+# RATE-LIMIT SCHEDULER
+#   Every LLM call in the process takes a slot from here first. Token
+#   buckets track requests and tokens per minute, the buckets are corrected
+#   from Groq's x-ratelimit-* response headers, and a 429 pauses everyone
+#   for its retry-after and sends the rejected call back into the queue.
+#   5xx responses and dropped connections are retried in place after a
+#   short backoff, as the SDKs would have done.
+#   Waiting callers form one priority queue, so exam grading goes ahead of
+#   question generation, which goes ahead of chat.
+# ─────────────────────────────────────────────────────────────
+PRIORITIES = {"grade": 0, "generate": 1, "chat": 2, "background": 3}
+REQUEUES   = 3     # 429s a single call is put back in the queue for before it fails
+RETRIES    = 2     # 5xx or connection failures a call is retried after, as the SDKs default to
+BACKOFF    = 0.5   # seconds before the first of those retries, doubling each time
+CONNECTION_ERRORS = (openai.APIConnectionError, groq.APIConnectionError)   # timeouts included
+
+DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+UNIT     = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def parse_duration(value):
+    # Groq resets look like "7.66s", "2m59.56s" or "120ms"; retry-after is
+    # plain seconds.
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parts = DURATION.findall(value)
+        return sum(float(n) * UNIT[u] for n, u in parts) if parts else None
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.capacity = float(per_minute)
+        self.level    = float(per_minute)
+        self.rate     = per_minute / 60.0
+        self.updated  = time.monotonic()
+
+    def refill(self, now):
+        self.level   = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for(self, amount, now):
+        # Seconds until `amount` can be taken; a request larger than the
+        # whole bucket only waits for a full one.
+        self.refill(now)
+        short = min(amount, self.capacity) - self.level
+        return short / self.rate if short > 0 else 0.0
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+    def sync(self, remaining, now):
+        # The server's count is authoritative when it is lower than ours.
+        self.refill(now)
+        self.level = min(self.level, remaining)
+
+
+class RateLimitScheduler:
+    def __init__(self, rpm=30, tpm=12000, poll=0.5):
+        self.requests     = TokenBucket(rpm)
+        self.tokens       = TokenBucket(tpm)
+        self.poll         = poll
+        self.paused_until = 0.0
+        self.waiting      = []   # heap of [priority, arrival]
+        self.arrivals     = itertools.count()
+        self.cond         = threading.Condition()
+        self.stats        = {"granted": 0, "queued": 0, "throttled": 0}
+
+    def grant_delay(self, ticket, tokens, now):
+        # None once the ticket has its slot, else seconds to wait.
+        if self.waiting[0] is not ticket:
+            return self.poll
+        delay = max(
+            self.paused_until - now,
+            self.requests.wait_for(1, now),
+            self.tokens.wait_for(tokens, now),
+        )
+        if delay > 0:
+            return delay
+        heapq.heappop(self.waiting)
+        self.requests.take(1)
+        self.tokens.take(tokens)
+        self.stats["granted"] += 1
+        self.cond.notify_all()
+        return None
+
+    def position(self, ticket):
+        return sorted(self.waiting).index(ticket) + 1
+
+    def acquire(self, priority, tokens=0, on_wait=None, block=True):
+        # Blocks until a request of ~`tokens` may go out and returns the
+        # seconds spent queued. on_wait(position) is called from the
+        # waiting thread about every poll interval. With block=False,
+        # returns None instead of queueing.
+        started = time.monotonic()
+        ticket  = [PRIORITIES.get(priority, priority), next(self.arrivals)]
+        with self.cond:
+            heapq.heappush(self.waiting, ticket)
+            delay = self.grant_delay(ticket, tokens, started)
+            if delay is None:
+                return 0.0
+            if not block:
+                self.forget(ticket)
+                return None
+            self.stats["queued"] += 1
+
+        try:
+            while True:
+                with self.cond:
+                    position = self.position(ticket)
+                if on_wait:
+                    on_wait(position)
+                with self.cond:
+                    self.cond.wait(min(delay, self.poll))
+                    now   = time.monotonic()
+                    delay = self.grant_delay(ticket, tokens, now)
+                    if delay is None:
+                        return now - started
+        except BaseException:
+            # e.g. the session's script was stopped while it waited
+            with self.cond:
+                self.forget(ticket)
+            raise
+
+    def requeue(self, call, priority, tokens=0, on_wait=None, limit=REQUEUES):
+        # Runs call(), which already holds a slot. A 429 has paused everyone
+        # through observe(), so the call queues for a new slot and goes again
+        # rather than failing; clients are built with max_retries=0 so the
+        # SDK doesn't retry behind the queue's back. Transient failures keep
+        # their slot and go again after a backoff.
+        requeued = retried = 0
+        while True:
+            try:
+                return call()
+            except Exception as e:
+                status = getattr(e, "status_code", None)
+                if status == 429 and requeued < limit:
+                    requeued += 1
+                    self.acquire(priority, tokens, on_wait)
+                elif (isinstance(e, CONNECTION_ERRORS) or (status or 0) >= 500) and retried < RETRIES:
+                    time.sleep(BACKOFF * 2 ** retried)
+                    retried += 1
+                else:
+                    raise
+
+    def forget(self, ticket):
+        if ticket in self.waiting:
+            self.waiting.remove(ticket)
+            heapq.heapify(self.waiting)
+        self.cond.notify_all()
+
+    def observe(self, response):
+        # httpx response hook, so it sees every call, retries included.
+        headers = response.headers
+        now     = time.monotonic()
+        with self.cond:
+            for bucket, kind in ((self.requests, "requests"), (self.tokens, "tokens")):
+                remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+                if remaining is None:
+                    continue
+                try:
+                    remaining = float(remaining)
+                except ValueError:
+                    continue
+                bucket.sync(remaining, now)
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+                if remaining <= 0 and reset:
+                    self.paused_until = max(self.paused_until, now + reset)
+
+            if response.status_code == 429:
+                self.stats["throttled"] += 1
+                retry = parse_duration(headers.get("retry-after")) or 1.0
+                self.paused_until = max(self.paused_until, now + retry)
+            self.cond.notify_all()
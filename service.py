@@ -0,0 +1,283 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+
+from backend import AYA_MESSAGE_FIELDS, Backend, load_secrets
+from metrics import Metrics
+from paper_gen import DIFFICULTIES, MAX_QUESTIONS, Q_TYPES
+
+# ─────────────────────────────────────────────────────────────
+# GENERATION SERVICE
+#   The backend (backend.py) behind a small JSON-over-HTTP API, so any
+#   number of Streamlit replicas can share one generation and grading tier
+#   and each tier scales on its own. Model calls run on the service's own
+#   thread pool; the event loop only moves bytes. Long answers stream as
+#   newline-delimited JSON events:
+#
+#     {"question": {...}}   one question of a paper
+#     {"text": "..."}       a piece of AyA's answer
+#     {"queue": 3}          waiting for a rate-limit slot, at this position
+#     {"error": "..."}      the call failed; nothing follows
+#     {"done": true}        the stream is complete
+#
+#   Grading jobs live in the job database, so replicas of this service
+#   sharing its disk see each other's jobs. Settings come from the app's
+#   .streamlit/secrets.toml; set BACKEND_URL (and BACKEND_TOKEN, if the
+#   service is started with one) there to point the app at it.
+#
+#   python service.py --port 8600 --workers 32
+# ─────────────────────────────────────────────────────────────
+SERVICE = {
+    "host":       "127.0.0.1",
+    "port":       8600,
+    "workers":    32,     # threads for model calls; each open stream holds one
+    "jsonl_path": "data/metrics/service.jsonl",
+    "prom_path":  "data/metrics/service.prom",
+}
+MAX_VARIANTS = 100   # papers one /v1/papers/variants call may ask for
+AYA_ROLES    = ("user", "assistant")   # the system prompt is AyA's own
+
+
+class BadRequest(Exception):
+    pass
+
+
+class Disconnected(BaseException):
+    # Not an Exception, so requests sharing this one's generation are told
+    # it was interrupted rather than seeing a failure of their own.
+    pass
+
+
+def field(body, name, kind=None, default=...):
+    value = body.get(name, default)
+    if value is ...:
+        raise BadRequest(f"missing field: {name}")
+    if kind and not isinstance(value, kind):
+        raise BadRequest(f"field {name} has the wrong type")
+    return value
+
+
+def bounded(body, name, low, high, default=...):
+    value = field(body, name, int, default)
+    if isinstance(value, bool) or not low <= value <= high:
+        raise BadRequest(f"field {name} must be between {low} and {high}")
+    return value
+
+
+def choice(body, name, options):
+    value = field(body, name, str)
+    if value not in options:
+        raise BadRequest(f"field {name} must be one of {', '.join(options)}")
+    return value
+
+
+def exam(body, q_type):
+    # The submitted paper and answers, in the shape the graders index into.
+    questions = field(body, "questions", list)
+    if not 1 <= len(questions) <= MAX_QUESTIONS:
+        raise BadRequest(f"questions must hold between 1 and {MAX_QUESTIONS} items")
+    needed = ("id", "question", "correct_answer") if q_type == "MCQ" else ("id", "question")
+    for q in questions:
+        if not isinstance(q, dict) or any(k not in q for k in needed):
+            raise BadRequest(f"each question must be an object with {', '.join(needed)}")
+        if isinstance(q["id"], bool) or not isinstance(q["id"], (int, str)) or not isinstance(q["question"], str):
+            raise BadRequest("question id must be an integer or string, and question a string")
+    answers = field(body, "answers", dict)
+    if not all(isinstance(a, str) or a is None for a in answers.values()):
+        raise BadRequest("answers must map question ids to strings")
+    return questions, answers
+
+
+def create_app(backend, workers=SERVICE["workers"], token=None):
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="service")
+
+    async def run(fn, *args):
+        return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+
+    def endpoint(handler):
+        # Bearer-token check and error mapping shared by every route.
+        async def wrapped(request):
+            if token and request.headers.get("authorization") != f"Bearer {token}":
+                return JSONResponse({"error": "unauthorized"}, status_code=401)
+            try:
+                body = await request.json() if request.method == "POST" else {}
+                if not isinstance(body, dict):
+                    raise BadRequest("expected a JSON object")
+                return await handler(request, body)
+            except (BadRequest, ValueError) as e:
+                return JSONResponse({"error": str(e)}, status_code=400)
+        return wrapped
+
+    def events(produce):
+        # Runs produce(emit) on the pool and relays what it emits
+        # as NDJSON. A client that disconnects stops the producer at its
+        # next event, which closes the upstream model stream.
+        async def body():
+            loop   = asyncio.get_running_loop()
+            out    = asyncio.Queue()
+            stop   = threading.Event()
+            finish = object()
+
+            def emit(event):
+                if stop.is_set():
+                    raise Disconnected
+                loop.call_soon_threadsafe(out.put_nowait, event)
+
+            def work():
+                try:
+                    produce(emit)
+                    emit({"done": True})
+                except Disconnected:
+                    pass
+                except Exception as e:
+                    loop.call_soon_threadsafe(out.put_nowait, {"error": f"{type(e).__name__}: {e}"})
+                finally:
+                    loop.call_soon_threadsafe(out.put_nowait, finish)
+
+            loop.run_in_executor(pool, work)
+            try:
+                while (event := await out.get()) is not finish:
+                    yield json.dumps(event) + "\n"
+            finally:
+                stop.set()
+        return StreamingResponse(body(), media_type="application/x-ndjson")
+
+    def relay(items, emit, key):
+        try:
+            for item in items:
+                emit({key: item})
+        finally:
+            items.close()
+
+    async def health(request, body):
+        return JSONResponse({"ok": True})
+
+    async def models(request, body):
+        return JSONResponse({"models": backend.models()})
+
+    async def paper(request, body):
+        args = {
+            "model":      field(body, "model", str),
+            "board":      field(body, "board", str),
+            "cls":        field(body, "class", str),
+            "subject":    field(body, "subject", str),
+            "chapter":    field(body, "chapter", str),
+            "num":        bounded(body, "num", 1, MAX_QUESTIONS),
+            "difficulty": choice(body, "difficulty", DIFFICULTIES),
+            "q_type":     choice(body, "q_type", Q_TYPES),
+        }
+        return events(lambda emit: relay(
+            backend.paper(**args, on_wait=lambda position: emit({"queue": position})), emit, "question",
+        ))
+
+    async def variants(request, body):
+        papers = await run(
+            backend.paper_variants,
+            field(body, "board", str), field(body, "class", str), field(body, "subject", str),
+            field(body, "chapter", str), choice(body, "difficulty", DIFFICULTIES), choice(body, "q_type", Q_TYPES),
+            bounded(body, "num", 1, MAX_QUESTIONS), bounded(body, "count", 1, MAX_VARIANTS, 1),
+            field(body, "seed", str, "0"),
+        )
+        return JSONResponse({"papers": papers})
+
+    async def grade_mcq(request, body):
+        return JSONResponse(backend.grade_mcq(*exam(body, "MCQ")))
+
+    async def submit(request, body):
+        q_type = choice(body, "q_type", Q_TYPES)
+        job_id = await run(
+            backend.submit_grading,
+            field(body, "model", str), q_type, field(body, "config", dict), *exam(body, q_type),
+        )
+        return JSONResponse({"id": job_id}, status_code=202)
+
+    async def job(request, body):
+        found = await run(backend.job, request.path_params["job_id"])
+        if not found:
+            return JSONResponse({"error": "no such job"}, status_code=404)
+        return JSONResponse(found)
+
+    async def retry(request, body):
+        found = await run(backend.job, request.path_params["job_id"])
+        if not found:
+            return JSONResponse({"error": "no such job"}, status_code=404)
+        try:
+            job_id = await run(backend.retry, found["id"])
+        except ValueError as e:
+            return JSONResponse({"error": str(e), "status": found["status"]}, status_code=409)
+        return JSONResponse({"id": job_id}, status_code=202)
+
+    async def aya(request, body):
+        messages = field(body, "messages", list)
+        if not messages or not all(isinstance(m, dict) and "role" in m and "content" in m for m in messages):
+            raise BadRequest("messages must be a non-empty list of {role, content}")
+        if any(m["role"] not in AYA_ROLES for m in messages):
+            raise BadRequest(f"message role must be one of {', '.join(AYA_ROLES)}")
+        # Known fields only, each of its own type; a client's memoized
+        # tokens and summary spare recounting the history.
+        messages = [
+            {k: field(m, k, kind) for k, kind in AYA_MESSAGE_FIELDS.items() if m.get(k) is not None}
+            for m in messages
+        ]
+        return events(lambda emit: relay(
+            backend.aya(messages, on_wait=lambda position: emit({"queue": position})), emit, "text",
+        ))
+
+    @contextlib.asynccontextmanager
+    async def lifespan(app):
+        yield
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    routes = [
+        Route("/v1/health",                 endpoint(health),    methods=["GET"]),
+        Route("/v1/models",                 endpoint(models),    methods=["GET"]),
+        Route("/v1/papers",                 endpoint(paper),     methods=["POST"]),
+        Route("/v1/papers/variants",        endpoint(variants),  methods=["POST"]),
+        Route("/v1/grade/mcq",              endpoint(grade_mcq), methods=["POST"]),
+        Route("/v1/grading",                endpoint(submit),    methods=["POST"]),
+        Route("/v1/grading/{job_id}",       endpoint(job),       methods=["GET"]),
+        Route("/v1/grading/{job_id}/retry", endpoint(retry),     methods=["POST"]),
+        Route("/v1/aya",                    endpoint(aya),       methods=["POST"]),
+    ]
+    return Starlette(routes=routes, lifespan=lifespan)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve paper generation, grading and AyA over HTTP.")
+    parser.add_argument("--secrets", default=".streamlit/secrets.toml")
+    parser.add_argument("--host")
+    parser.add_argument("--port",    type=int)
+    parser.add_argument("--workers", type=int, help="threads for model calls")
+    args = parser.parse_args()
+
+    secrets = load_secrets(args.secrets)
+    config  = dict(SERVICE, **secrets.get("service", {}))
+    for k in ("host", "port", "workers"):
+        if getattr(args, k) is not None:
+            config[k] = getattr(args, k)
+    secrets.setdefault("GROQ_API_KEY", os.environ.get("GROQ_API_KEY"))
+    if not secrets["GROQ_API_KEY"]:
+        sys.exit(f"GROQ_API_KEY not found in {args.secrets} or the environment.")
+
+    metrics = Metrics(config["jsonl_path"], config["prom_path"])
+    backend = Backend(secrets, metrics)
+    token   = secrets.get("BACKEND_TOKEN") or os.environ.get("BACKEND_TOKEN")
+    try:
+        uvicorn.run(create_app(backend, config["workers"], token), host=config["host"], port=config["port"])
+    finally:
+        with metrics.lock:
+            metrics.flush()
+
+
+if __name__ == "__main__":
+    main()
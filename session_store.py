@@ -0,0 +1,183 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:   # optional: zlib is used when it isn't installed
+    zstandard = None
+
+# ─────────────────────────────────────────────────────────────
+# SESSION STORE
+#   Chat history, the current exam and finished exams, kept on disk under a
+#   per-browser token so server memory only holds a small hot window and a
+#   reconnecting student gets their session back. Blobs are zstd (or zlib)
+#   compressed JSON. Live sessions report their in-memory size here, and
+#   each is held to its share of a global cap; a session still over it
+#   parks its current exam here until it next needs it. A token is only
+#   ever held by one live session: a second tab or a shared link gets a
+#   copy under a token of its own.
+# ─────────────────────────────────────────────────────────────
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    token       TEXT    PRIMARY KEY,
+    state       BLOB    NOT NULL,
+    updated_at  REAL    NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    token       TEXT    NOT NULL,
+    seq         INTEGER NOT NULL,
+    body        BLOB    NOT NULL,
+    PRIMARY KEY (token, seq)
+);
+CREATE TABLE IF NOT EXISTS exams (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    token       TEXT    NOT NULL,
+    body        BLOB    NOT NULL,
+    created_at  REAL    NOT NULL
+);
+CREATE TABLE IF NOT EXISTS parked (
+    token       TEXT    PRIMARY KEY,
+    body        BLOB    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_exams_token      ON exams(token, created_at);
+CREATE INDEX IF NOT EXISTS idx_sessions_updated ON sessions(updated_at);
+"""
+
+
+def pack(obj):
+    raw = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+    if zstandard:
+        return b"Z" + zstandard.ZstdCompressor(level=3).compress(raw)
+    return b"z" + zlib.compress(raw, 6)
+
+
+def unpack(blob):
+    codec, body = blob[:1], blob[1:]
+    if codec == b"Z":
+        raw = zstandard.ZstdDecompressor().decompress(body)
+    else:
+        raw = zlib.decompress(body)
+    return json.loads(raw)
+
+
+class SessionStore:
+    def __init__(self, path, hot_messages=6, session_bytes=256 * 1024, global_bytes=128 * 1024 * 1024,
+                 idle=1800, ttl=30 * 24 * 3600):
+        self.hot_messages  = hot_messages
+        self.session_bytes = session_bytes
+        self.global_bytes  = global_bytes
+        self.idle          = idle
+        self.live          = {}   # token -> (in-memory bytes, last seen)
+        self.lock          = threading.Lock()
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        with self.lock:
+            stale = time.time() - ttl
+            self.db.execute("DELETE FROM messages WHERE token IN (SELECT token FROM sessions WHERE updated_at < ?)", (stale,))
+            self.db.execute("DELETE FROM parked WHERE token IN (SELECT token FROM sessions WHERE updated_at < ?)", (stale,))
+            self.db.execute("DELETE FROM exams WHERE created_at < ?", (stale,))
+            self.db.execute("DELETE FROM sessions WHERE updated_at < ?", (stale,))
+            self.db.commit()
+
+    @staticmethod
+    def new_token():
+        return secrets.token_urlsafe(16)
+
+    def attach(self, token):
+        # The token a new browser session should use. If another live session
+        # already holds `token`, its stored session is copied to a fresh one,
+        # so neither can clear or overwrite the other's history.
+        now = time.time()
+        with self.lock:
+            seen = self.live.get(token)
+            if not seen or now - seen[1] > self.idle:
+                self.live[token] = (0, now)
+                return token
+            copy = self.new_token()
+            self.live[copy] = (0, now)
+            for table, cols in (("sessions", "state, updated_at"), ("messages", "seq, body"),
+                                ("parked", "body"), ("exams", "body, created_at")):
+                self.db.execute(
+                    f"INSERT INTO {table} (token, {cols}) SELECT ?, {cols} FROM {table} WHERE token = ?", (copy, token)
+                )
+            self.db.commit()
+        return copy
+
+    def load_state(self, token):
+        with self.lock:
+            row = self.db.execute("SELECT state FROM sessions WHERE token = ?", (token,)).fetchone()
+        return unpack(row[0]) if row else None
+
+    def save_state(self, token, state):
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO sessions (token, state, updated_at) VALUES (?, ?, ?)",
+                (token, pack(state), time.time()),
+            )
+            self.db.commit()
+
+    def save_messages(self, token, first_seq, messages):
+        with self.lock:
+            self.db.executemany(
+                "INSERT OR REPLACE INTO messages (token, seq, body) VALUES (?, ?, ?)",
+                [(token, first_seq + i, pack(m)) for i, m in enumerate(messages)],
+            )
+            self.db.commit()
+
+    def clear_messages(self, token):
+        with self.lock:
+            self.db.execute("DELETE FROM messages WHERE token = ?", (token,))
+            self.db.commit()
+
+    def load_messages(self, token):
+        with self.lock:
+            rows = self.db.execute("SELECT body FROM messages WHERE token = ? ORDER BY seq", (token,)).fetchall()
+        return [unpack(body) for (body,) in rows]
+
+    def archive_exam(self, token, exam):
+        with self.lock:
+            self.db.execute(
+                "INSERT INTO exams (token, body, created_at) VALUES (?, ?, ?)", (token, pack(exam), time.time())
+            )
+            self.db.commit()
+
+    def exams(self, token, limit=10):
+        with self.lock:
+            rows = self.db.execute(
+                "SELECT body, created_at FROM exams WHERE token = ? ORDER BY created_at DESC LIMIT ?", (token, limit)
+            ).fetchall()
+        return [dict(unpack(body), created_at=created_at) for body, created_at in rows]
+
+    def park(self, token, obj):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO parked (token, body) VALUES (?, ?)", (token, pack(obj)))
+            self.db.commit()
+
+    def unpark(self, token):
+        # The row stays until the next park(), so a snapshot saved while the
+        # exam was parked can still be restored after a restart.
+        with self.lock:
+            row = self.db.execute("SELECT body FROM parked WHERE token = ?", (token,)).fetchone()
+        return unpack(row[0]) if row else None
+
+    def budget(self, token, used):
+        # Records this session's in-memory size and returns the bytes it may
+        # keep: the per-session cap, or an even share of the global cap once
+        # the live sessions together go over it.
+        now = time.time()
+        with self.lock:
+            self.live[token] = (used, now)
+            for t in [t for t, (_, seen) in self.live.items() if now - seen > self.idle]:
+                del self.live[t]
+            if sum(size for size, _ in self.live.values()) <= self.global_bytes:
+                return self.session_bytes
+            return min(self.session_bytes, self.global_bytes // len(self.live))
@@ -0,0 +1,121 @@
+import copy
+import hashlib
+import json
+import threading
+from concurrent.futures import Future
+
+# ─────────────────────────────────────────────────────────────
+# SINGLE FLIGHT
+#   Coalesces identical in-flight work across sessions. The first caller
+#   for a key does the work; callers that arrive while it is running attach
+#   to it instead of issuing their own upstream request. Streams are
+#   replayed from the start, then followed live.
+# ─────────────────────────────────────────────────────────────
+
+def flight_key(*parts):
+    raw = json.dumps(parts, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class Abandoned(RuntimeError):
+    pass
+
+
+class Flight:
+    def __init__(self):
+        self.items = []
+        self.done  = False
+        self.error = None
+        self.cond  = threading.Condition()
+
+    def publish(self, item):
+        with self.cond:
+            self.items.append(item)
+            self.cond.notify_all()
+
+    def finish(self, error=None):
+        with self.cond:
+            self.done  = True
+            self.error = error
+            self.cond.notify_all()
+
+    def follow(self):
+        i = 0
+        while True:
+            with self.cond:
+                while i >= len(self.items) and not self.done:
+                    self.cond.wait()
+                if i >= len(self.items):
+                    if self.error:
+                        raise self.error
+                    return
+                item = self.items[i]
+            i += 1
+            # Followers get their own copy; the leader's items may be mutated
+            # by its session.
+            yield copy.deepcopy(item)
+
+
+class SingleFlight:
+    def __init__(self):
+        self.calls   = {}   # key -> Future
+        self.streams = {}   # key -> Flight
+        self.lock    = threading.Lock()
+        self.stats   = {"leaders": 0, "joined": 0}
+
+    def call(self, key, fn, *args, **kwargs):
+        with self.lock:
+            fut = self.calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = self.calls[key] = Future()
+                self.stats["leaders"] += 1
+            else:
+                self.stats["joined"] += 1
+        if not leader:
+            return fut.result()
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self.lock:
+                del self.calls[key]
+
+    def stream(self, key, produce):
+        # produce() is only called by the leader, in the leader's own thread,
+        # so it can keep using that session's UI callbacks.
+        with self.lock:
+            flight = self.streams.get(key)
+            leader = flight is None
+            if leader:
+                flight = self.streams[key] = Flight()
+                self.stats["leaders"] += 1
+            else:
+                self.stats["joined"] += 1
+        if not leader:
+            yield from flight.follow()
+            return
+
+        try:
+            for item in produce():
+                flight.publish(item)
+                yield item
+        except Exception as e:
+            flight.finish(e)
+            raise
+        except BaseException:
+            # The leader's script was stopped or its consumer went away.
+            flight.finish(Abandoned("the shared request was interrupted, please try again"))
+            raise
+        else:
+            flight.finish()
+        finally:
+            with self.lock:
+                if self.streams.get(key) is flight:
+                    del self.streams[key]
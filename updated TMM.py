@@ -1,17 +1,45 @@
 import streamlit as st
-from groq import Groq
-from openai import OpenAI
 import base64
+import hashlib
+import io
+import itertools
 import json
 import sys
-import PyPDF2
+import time
+from PIL import Image, ImageOps
+from streamlit.errors import StreamlitAPIException
+from backend import Backend, message_summary, message_tokens
+from backend_client import RemoteBackend
+from metrics import Metrics
+from paper_gen import DIFFICULTIES, MAX_QUESTIONS, Q_TYPES
+from pdf_ingest import PdfIngestor
+from retrieval import Bm25Index, chunk_pages
+from session_store import SessionStore
+
+RUN_STARTED = time.perf_counter()
 
 # ─────────────────────────────────────────────────────────────
 # 1. PAGE CONFIG
 # ─────────────────────────────────────────────────────────────
+LOGO_PX = 88   # 2x the 44px nav badge so it stays crisp on hi-dpi screens
+
+@st.cache_resource(show_spinner=False)
+def load_logo(path="logo.png", size=LOGO_PX):
+    # Downscale once per process; every session and rerun reuses the result.
+    try:
+        with Image.open(path) as src:
+            thumb = ImageOps.fit(src.convert("RGBA"), (size, size), Image.LANCZOS)
+    except Exception:
+        return None, None
+    buf = io.BytesIO()
+    thumb.save(buf, format="PNG", optimize=True)
+    return thumb, base64.b64encode(buf.getvalue()).decode()
+
+logo_img, logo_b64 = load_logo()
+
 st.set_page_config(
     page_title="The Molecular Man AI Suite",
-    page_icon="logo.png",
+    page_icon=logo_img or "🧬",
     layout="wide",
     initial_sidebar_state="collapsed"
 )
@@ -297,27 +325,67 @@ div[data-testid="stVerticalBlockBorderWrapper"] {
 # ─────────────────────────────────────────────────────────────
 # 3. HELPERS
 # ─────────────────────────────────────────────────────────────
-def get_img_b64(path):
-    try:
-        with open(path, "rb") as f:
-            return base64.b64encode(f.read()).decode()
-    except Exception:
-        return None
+def whole_pdf_problem(doc, name):
+    # The document itself reaches AyA as retrieved excerpts each turn, so the
+    # opening message only names it.
+    pages = len(doc["pages"])
+    return {
+        "role": "user", "doc": doc["hash"],
+        "content": f"PROBLEM from PDF:\n📕 {name} — whole document ({pages} pages). "
+                   f"Walk me through the problems in it.",
+    }
+
+# Chat and exam history on disk, with only a hot window in memory; override
+# any of these from a [session_store] table in Streamlit Secrets.
+SESSION_STORE = {
+    "path":          "data/sessions.db",
+    "hot_messages":  6,                   # latest chat messages kept in full
+    "session_bytes": 256 * 1024,          # in-memory cap per session
+    "global_bytes":  128 * 1024 * 1024,   # shared by all live sessions
+    "idle":          1800,                # seconds before a session stops counting as live
+    "ttl":           30 * 24 * 3600,      # seconds a saved session can be restored
+}
 
-def clean_input(text):
-    if not text: return ""
-    return text.encode("ascii", "ignore").decode("ascii").strip()
+@st.cache_resource(show_spinner=False)
+def get_session_store():
+    return SessionStore(**SESSION_STORE)
 
-def get_groq_openai_client(api_key):
-    return OpenAI(api_key=api_key, base_url="https://api.groq.com/openai/v1")
+def queue_notice(placeholder):
+    # on_wait callback for backend calls: shows the session its place in
+    # the shared queue instead of an error.
+    return lambda position: placeholder.caption(
+        f"⏳ Lots of students are asking right now — you're #{position} in line…"
+    )
 
-def fetch_available_models(api_key):
-    try:
-        client = get_groq_openai_client(api_key)
-        models = client.models.list()
-        return sorted([m.id for m in models.data])
-    except Exception:
-        return ["llama-3.3-70b-versatile"]
+# Per-call LLM timings, rerun and PDF timings; override any of these from a
+# [metrics] table in Streamlit Secrets.
+METRICS = {
+    "jsonl_path":     "data/metrics/events.jsonl",
+    "prom_path":      "data/metrics/metrics.prom",
+    "flush_interval": 15.0,   # seconds between rewrites of the Prometheus file
+}
+
+@st.cache_resource(show_spinner=False)
+def get_metrics():
+    return Metrics(**METRICS)
+
+@st.cache_resource(show_spinner=False)
+def get_pdf_ingestor():
+    return PdfIngestor("data/pdf_cache")
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def get_retrieval_index(doc_hash):
+    doc = get_pdf_ingestor().get(doc_hash)
+    return Bm25Index(chunk_pages(doc["pages"])) if doc else None
+
+@st.cache_resource(show_spinner=False)
+def get_backend():
+    # Paper generation, grading and AyA run on the generation service
+    # (service.py) when a BACKEND_URL secret points at one, so UI replicas
+    # share it; otherwise in this process, configured from the same secrets.
+    if st.secrets.get("BACKEND_URL"):
+        return RemoteBackend(st.secrets["BACKEND_URL"], st.secrets.get("BACKEND_TOKEN"))
+    return Backend(st.secrets, get_metrics())
 
 # ─────────────────────────────────────────────────────────────
 # 4. SESSION STATE
@@ -326,182 +394,242 @@ defaults = {
     "active_tab":      "aya",          # "aya" | "mock"
     "aya_messages":    [],
     "aya_uploader_key": 0,
+    "aya_pdf":         None,           # {"hash", "name"} of the last analysed PDF
+    "aya_stored":      0,              # messages already written to the session store
     "mt_questions":    None,
+    "mt_pending":      None,           # paper request still streaming into VIEW C
+    "mt_error":        None,
     "mt_user_answers": {},
     "mt_feedback":     None,
+    "mt_summary":      None,
+    "mt_job":          None,           # background feedback job still running
+    "mt_parked":       False,          # current exam moved to the session store to save memory
     "mt_score":        0,
     "mt_total_marks":  0,
     "mt_q_type":       "MCQ",
     "mt_config":       {},             # saves last config for results header
-    "mt_models":       [],
 }
 for k, v in defaults.items():
     if k not in st.session_state:
         st.session_state[k] = v
 
 # ─────────────────────────────────────────────────────────────
-# 5. API KEY
+# 5. BACKEND
 # ─────────────────────────────────────────────────────────────
-try:
-    GROQ_API_KEY = st.secrets["GROQ_API_KEY"]
-except Exception:
+if not st.secrets.get("BACKEND_URL") and not st.secrets.get("GROQ_API_KEY"):
     st.error("⚠️ GROQ_API_KEY not found in Streamlit Secrets. Please add it in Settings → Secrets.")
     st.stop()
 
-if not st.session_state.mt_models:
-    st.session_state.mt_models = fetch_available_models(GROQ_API_KEY)
+METRICS.update(st.secrets.get("metrics", {}))
+SESSION_STORE.update(st.secrets.get("session_store", {}))
+metrics       = get_metrics()
+store         = get_session_store()
+backend       = get_backend()
+
+# State that is saved under the browser's session token. The token travels
+# in the URL (?s=), so a reconnect on the same URL picks the session back up;
+# a URL whose session is still open elsewhere gets a copy of it instead.
+PERSISTED_STATE = [
+    "active_tab", "aya_messages", "aya_stored", "aya_pdf",
+    "mt_questions", "mt_user_answers", "mt_feedback", "mt_summary", "mt_job", "mt_parked",
+    "mt_score", "mt_total_marks", "mt_q_type", "mt_config",
+]
+
+if "session_token" not in st.session_state:
+    token = st.query_params.get("s")
+    token = store.attach(token) if token else None
+    saved = store.load_state(token) if token else None
+    if saved:
+        for k, v in saved.items():
+            st.session_state[k] = v
+    else:
+        token = store.new_token()
+    st.session_state.session_token = token
+    st.query_params["s"] = token
 
 # ─────────────────────────────────────────────────────────────
-# 6. SYSTEM PROMPT  (AyA)
+# 6. PDF EXCERPTS  (AyA)
 # ─────────────────────────────────────────────────────────────
-AYA_SYSTEM_PROMPT = """You are **AyA**, the Lead AI Tutor at **The Molecular Man Expert Tuition Solutions**, Madurai.
-Your mission: guide students from "Zero" (absolute beginner) to "Hero" (advanced mastery).
-Your tone: encouraging, clear, patient, and intellectually rigorous.
-
-### RESPONSE GUIDELINES
-1. **Conversational Follow-ups:** Answer follow-up questions directly without repeating the full structure.
-2. **Main Problem Structure:**
-   - 🧠 **CONCEPT** — What principle is at play?
-   - 🌍 **REAL-WORLD CONTEXT** — Where do we see this in life?
-   - ✍️ **SOLUTION** — Step-by-step working.
-   - ✅ **ANSWER** — Clear final answer.
-   - 🚀 **HERO TIP** — An insight that turns good students into great ones.
-3. **Formatting:** Bold for keywords, LaTeX for all equations.
-4. **Scope:** Chemistry, Physics, Maths, Biology (Classes 6–12, NEET, JEE, Boards).
-"""
+AYA_EXCERPTS = 4   # document chunks sent with each turn of a PDF conversation
+
+def attach_excerpts(messages):
+    # PDF conversations carry the document hash on their opening message.
+    # Each turn re-grounds it with the chunks most relevant to the latest
+    # question, falling back to the start of the document.
+    head  = messages[0]
+    index = get_retrieval_index(head["doc"]) if head.get("doc") else None
+    if not index or not index.chunks:
+        return
+    query = next(m["content"] for m in reversed(messages) if m["role"] == "user")
+    hits  = index.search(query, AYA_EXCERPTS) or index.chunks[:AYA_EXCERPTS]
+    head["excerpts"] = "\n\nRelevant excerpts from the uploaded PDF:\n" + "\n\n".join(
+        f"[p. {c['page']}] {c['text']}" for c in hits
+    )
 
 # ─────────────────────────────────────────────────────────────
 # 7. MOCK TEST FUNCTIONS
 # ─────────────────────────────────────────────────────────────
-def generate_questions(api_key, model, board, cls, subject, chapter, num, difficulty, q_type):
-    client = get_groq_openai_client(api_key)
-    safe_sub  = clean_input(subject)
-    safe_chap = clean_input(chapter)
-
-    context = (
-        f"You are a strict Textbook Author and Examiner for the {board} Board. "
-        f"Subject: {safe_sub}, Class: {cls}, Chapter: '{safe_chap}'.\n"
-        f"RULES: Questions must be factually 100% correct per standard {board} textbooks. "
-        f"No ambiguous questions. Exactly one indisputable correct answer."
-    )
-
-    if q_type == "MCQ":
-        prompt = f"""{context}
-Create a valid JSON list of exactly {num} {difficulty}-level Multiple Choice Questions.
-
-Format:
-[
-  {{"id": 1, "question": "...", "options": ["A", "B", "C", "D"], "correct_answer": "A"}}
-]
-Verify: correct_answer must match one option exactly and be factually correct.
-Return ONLY raw JSON. No explanation. No markdown fences."""
-    else:
-        prompt = f"""{context}
-Create a valid JSON list of exactly {num} {difficulty}-level Descriptive Questions with marks.
-
-Format:
-[
-  {{"id": 1, "question": "...", "marks": 3}}
-]
-Return ONLY raw JSON. No explanation. No markdown fences."""
-
-    try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[
-                {"role": "system", "content": "You are a precise academic assistant. Output strictly valid JSON only."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.1
-        )
-        content = resp.choices[0].message.content.strip()
-        content = content.replace("```json", "").replace("```", "").strip()
-        return json.loads(content)
-    except Exception as e:
-        st.error(f"❌ Question generation failed: {str(e)}")
-        return None
-
-
-def grade_mcq(api_key, model, questions, user_answers, board, cls, subject):
-    client = get_groq_openai_client(api_key)
-    score = 0
-    incorrect_log = ""
-
-    for q in questions:
-        q_id    = str(q["id"])
-        u_ans   = user_answers.get(q_id)
-        c_ans   = q["correct_answer"]
-        if u_ans == c_ans:
-            score += 1
-        else:
-            incorrect_log += f"Q: {q['question']}\nStudent: {u_ans}\nCorrect: {c_ans}\n\n"
-
-    st.session_state.mt_score       = score
-    st.session_state.mt_total_marks = len(questions)
-
-    if score == len(questions):
-        return "### 🏆 Perfect Score!\nYou have completely mastered this topic. Outstanding work."
-
-    prompt = f"""
-The student scored {score}/{len(questions)} in a {board} Class {cls} {subject} MCQ test.
-Mistakes:
-{incorrect_log}
-
-Provide a "Scope for Improvement" analysis.
-For each wrong answer, clearly explain WHY it was wrong and WHY the correct answer is right.
-Format in clean Markdown with headers per question.
-"""
+def stream_exam_paper(pending, progress):
+    # Feeds VIEW C's form as questions arrive, keeping mt_questions in step.
+    # An empty result sends the student back to VIEW A with the error.
+    st.session_state.mt_questions = []
+    num = pending["num"]
+    progress.caption(f"🧠 Generating {pending['board']} pattern {pending['q_type']}s for {pending['chapter']}…")
     try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.3
-        )
-        return resp.choices[0].message.content
+        for q in backend.paper(**pending, on_wait=queue_notice(progress)):
+            st.session_state.mt_questions.append(q)
+            progress.caption(f"🧠 {len(st.session_state.mt_questions)} of {num} questions ready…")
+            yield q
     except Exception as e:
-        return f"Error analysing performance: {str(e)}"
-
-
-def grade_descriptive(api_key, model, questions, user_answers, board, cls, subject):
-    client = get_groq_openai_client(api_key)
-    qa_data = ""
-    total_possible = 0
-
-    for q in questions:
-        q_id  = str(q["id"])
-        u_ans = user_answers.get(q_id, "No Answer Provided")
-        marks = q.get("marks", 1)
-        total_possible += marks
-        qa_data += f"Q ({marks} marks): {q['question']}\nStudent Answer: {u_ans}\n\n"
-
-    st.session_state.mt_total_marks = total_possible
-
-    prompt = f"""
-You are a strict examiner for {board} Class {cls} {subject}.
-Evaluate these descriptive answers per standard Board marking schemes.
-
-{qa_data}
+        st.session_state.mt_error = f"❌ Question generation failed: {str(e)}"
+    st.session_state.mt_pending = None
 
-Requirements:
-1. Award marks for EACH question with justification.
-2. State Total Score obtained out of {total_possible}.
-3. Provide "Scope for Improvement" noting missing keywords or concepts.
-Format clearly in Markdown.
-"""
-    try:
-        resp = client.chat.completions.create(
-            model=model,
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.2
-        )
-        return resp.choices[0].message.content
-    except Exception as e:
-        return f"Error grading descriptive answers: {str(e)}"
+    got = len(st.session_state.mt_questions)
+    if got and got < num:
+        progress.warning(f"⚠️ Only {got} of {num} distinct questions could be generated.")
+    else:
+        progress.empty()
+    if not got:
+        st.session_state.mt_questions = None
+
+
+def grade_mcq(questions, user_answers):
+    # Scored and explained from the explanations generated with each
+    # question, so submitting never waits on the model.
+    graded = backend.grade_mcq(questions, user_answers)
+    st.session_state.mt_score       = graded["score"]
+    st.session_state.mt_total_marks = graded["total"]
+    return graded["report"]
+
+def submit_exam(model):
+    # Scores what can be scored locally, queues the rest as a job, and puts
+    # the job id in the URL so a reconnecting browser can reopen the results.
+    questions, answers = st.session_state.mt_questions, st.session_state.mt_user_answers
+    q_type = st.session_state.mt_q_type
+    if q_type == "MCQ":
+        st.session_state.mt_feedback = grade_mcq(questions, answers)
+    else:
+        st.session_state.mt_feedback    = None
+        st.session_state.mt_total_marks = sum(q.get("marks", 1) for q in questions)
+    st.session_state.mt_job     = backend.submit_grading(model, q_type, st.session_state.mt_config, questions, answers)
+    st.session_state.mt_summary = None
+    st.query_params["exam"] = st.session_state.mt_job
+
+def apply_job(job):
+    # Moves a finished job's result into session state.
+    st.session_state.mt_job = None
+    if job["kind"] == "mcq_summary":
+        st.session_state.mt_summary = (job["result"] or {}).get("text", "")
+    elif job["status"] == "done":
+        st.session_state.mt_feedback    = job["result"]
+        st.session_state.mt_score       = job["result"]["score"]
+        st.session_state.mt_total_marks = job["result"]["total"]
+    else:
+        st.session_state.mt_feedback = {
+            "score": 0, "total": st.session_state.mt_total_marks, "results": [],
+            "error": job["error"] or "Grading did not finish.", "job": job["id"],
+        }
+
+def restore_exam(job_id):
+    # A new session opened on ?exam=<job id>: rebuild the results view.
+    job = backend.job(job_id)
+    if not job:
+        del st.query_params["exam"]
+        return
+    payload = job["payload"]
+    st.session_state.active_tab      = "mock"
+    st.session_state.mt_questions    = payload["questions"]
+    st.session_state.mt_user_answers = payload["answers"]
+    st.session_state.mt_config       = payload["config"]
+    st.session_state.mt_q_type       = payload["q_type"]
+    st.session_state.mt_job          = job_id
+    if payload["q_type"] == "MCQ":
+        st.session_state.mt_feedback = grade_mcq(payload["questions"], payload["answers"])
+    else:
+        st.session_state.mt_total_marks = sum(q.get("marks", 1) for q in payload["questions"])
+    if job["status"] not in ("queued", "running"):
+        apply_job(job)
+
+# ── Session store ─────────────────────────────────────────────
+def spill_messages(messages, keep):
+    # Past the opening problem and the last `keep` messages, only a short
+    # stand-in stays in memory. Answers keep the summary build_aya_context
+    # would send for them anyway; the full text is in the session store.
+    for msg in messages[1:max(1, len(messages) - keep)]:
+        if msg.get("spilled"):
+            continue
+        message_tokens(msg)
+        msg["content"] = message_summary(msg) if msg["role"] == "assistant" else msg["content"][:400]
+        msg["spilled"] = True
+
+# The parts of an exam that can be parked: everything that grows with it.
+EXAM_STATE = ["mt_questions", "mt_user_answers", "mt_feedback", "mt_summary"]
+
+def park_exam():
+    # Last resort for a session over its memory share: the current exam
+    # moves to the session store until load_exam() brings it back.
+    if not st.session_state.mt_questions or st.session_state.mt_pending:
+        return False
+    store.park(st.session_state.session_token, {k: st.session_state[k] for k in EXAM_STATE})
+    st.session_state.mt_questions    = None
+    st.session_state.mt_user_answers = {}
+    st.session_state.mt_feedback     = None
+    st.session_state.mt_summary      = None
+    st.session_state.mt_parked       = True
+    return True
+
+def load_exam():
+    # Called before anything reads the exam: at the top of each run and of
+    # each Mock Test fragment.
+    if st.session_state.mt_parked:
+        for k, v in (store.unpark(st.session_state.session_token) or {}).items():
+            st.session_state[k] = v
+        st.session_state.mt_parked = False
+
+def sync_session():
+    # Writes new chat messages and a snapshot of the session. Only the last
+    # hot_messages of the chat stay in full; a session still over its share
+    # of memory keeps fewer, and then parks its exam.
+    token    = st.session_state.session_token
+    messages = st.session_state.aya_messages
+    if messages:
+        if not messages[0].get("stored"):   # a new problem started a new chat
+            store.clear_messages(token)
+            st.session_state.aya_stored = 0
+        new = messages[st.session_state.aya_stored:]
+        if new:
+            for msg in new:
+                msg["stored"] = True
+            store.save_messages(token, st.session_state.aya_stored, new)
+            st.session_state.aya_stored = len(messages)
+
+    keep = SESSION_STORE["hot_messages"]
+    spill_messages(messages, keep)
+    if messages:
+        messages[0].pop("excerpts", None)   # attach_excerpts rebuilds them every turn
+
+    state  = {k: st.session_state[k] for k in PERSISTED_STATE}
+    blob   = json.dumps(state)
+    budget = store.budget(token, len(blob))
+    while len(blob) > budget and keep:
+        keep //= 2
+        spill_messages(messages, keep)
+        blob = json.dumps(state)
+    if len(blob) > budget and park_exam():
+        state = {k: st.session_state[k] for k in PERSISTED_STATE}
+        blob  = json.dumps(state)
+    digest = hashlib.blake2b(blob.encode("utf-8"), digest_size=16).digest()
+    if digest != st.session_state.get("saved_state"):   # a digest, not a second copy of the state
+        store.save_state(token, state)
+        st.session_state.saved_state = digest
+
+load_exam()
+if st.query_params.get("exam") and not st.session_state.mt_questions and not st.session_state.mt_pending:
+    restore_exam(st.query_params["exam"])
 
 # ─────────────────────────────────────────────────────────────
 # 8. NAV BAR
 # ─────────────────────────────────────────────────────────────
-logo_b64 = get_img_b64("logo.png")
 logo_html = (
     f'<img src="data:image/png;base64,{logo_b64}" '
     f'style="height:44px;width:44px;border-radius:50%;border:2px solid #ffd700;'
@@ -528,62 +656,34 @@ st.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
-# Hidden Streamlit buttons the nav calls
+def set_tab(tab):
+    st.session_state.active_tab = tab
+
+# Hidden Streamlit buttons the nav calls. The callback runs before the
+# click's own rerun, so switching tabs costs one script run, not two.
 col_nav1, col_nav2, *_ = st.columns([1, 1, 6])
 with col_nav1:
-    if st.button("AyA Tutor", key="btn-aya"):
-        st.session_state.active_tab = "aya"
-        st.rerun()
+    st.button("AyA Tutor", key="btn-aya", on_click=set_tab, args=("aya",))
 with col_nav2:
-    if st.button("Mock Tests", key="btn-mt"):
-        st.session_state.active_tab = "mock"
-        st.rerun()
+    st.button("Mock Tests", key="btn-mt", on_click=set_tab, args=("mock",))
 
 st.markdown('<div style="height:12px;"></div>', unsafe_allow_html=True)
 
 # ─────────────────────────────────────────────────────────────
 # 9. AyA TUTOR TAB
 # ─────────────────────────────────────────────────────────────
-if st.session_state.active_tab == "aya":
-
-    # ── Hero header ──────────────────────────────────────────
-    st.markdown("""
-    <div style="text-align:center;padding:32px 16px 20px;">
-      <div style="display:inline-flex;align-items:center;gap:8px;padding:5px 16px;
-                  border-radius:20px;background:rgba(109,40,217,.18);
-                  border:1px solid rgba(167,139,250,.4);margin-bottom:16px;">
-        <span style="width:8px;height:8px;border-radius:50%;background:#a78bfa;display:inline-block;
-                     box-shadow:0 0 8px #a78bfa;"></span>
-        <span style="font-size:.72rem;font-weight:800;letter-spacing:2px;color:#c4b5fd !important;">LIVE · 24 / 7</span>
-      </div>
-      <h1 style="font-size:clamp(2rem,6vw,3.5rem);font-weight:900;margin:0;
-                 background:linear-gradient(135deg,#fff 0%,#c4b5fd 35%,#00ffff 70%,#ffd700 100%);
-                 -webkit-background-clip:text;-webkit-text-fill-color:transparent;">
-        Meet AyA
-      </h1>
-      <p style="color:#94a3b8 !important;font-size:1rem;margin-top:8px;max-width:520px;margin-left:auto;margin-right:auto;line-height:1.7;">
-        Your 24/7 AI Tutor. Ask any doubt — Chemistry, Physics, Maths, Biology.<br>
-        She doesn't sleep. She doesn't judge. She simply teaches.
-      </p>
-    </div>
-    """, unsafe_allow_html=True)
-
-    # ── Stats row ─────────────────────────────────────────────
-    sc1, sc2, sc3, sc4 = st.columns(4)
-    for col, num, lbl in [
-        (sc1, "24/7", "Always Online"),
-        (sc2, "₹0",  "Cost Forever"),
-        (sc3, "6+",  "Boards Covered"),
-        (sc4, "∞",   "Questions Answered"),
-    ]:
-        with col:
-            st.markdown(f"""
-            <div class="glass-card stat-box">
-              <div class="stat-num">{num}</div>
-              <div class="stat-lbl">{lbl}</div>
-            </div>""", unsafe_allow_html=True)
+def rerun_fragment():
+    # A fragment-scoped rerun is only legal while the fragment is rerunning
+    # on its own; when it was drawn as part of a full run, rerun everything.
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
 
-    st.markdown("---")
+@st.fragment
+def aya_chat():
+    # Problem input and the conversation rerun on their own, so sending a
+    # problem or a follow-up leaves the rest of the page untouched.
 
     # ── Problem input ─────────────────────────────────────────
     with st.expander("📝 Start a New Problem", expanded=(len(st.session_state.aya_messages) == 0)):
@@ -596,34 +696,72 @@ if st.session_state.active_tab == "aya":
                 if user_text.strip():
                     st.session_state.aya_messages = []
                     st.session_state.aya_messages.append({"role": "user", "content": f"PROBLEM:\n{user_text}"})
-                    st.rerun()
+                    rerun_fragment()
                 else:
                     st.warning("Please enter a question first.")
 
         else:
             uploader_key = f"pdf_{st.session_state.aya_uploader_key}"
-            pdf_file = st.file_uploader("Upload a PDF (first 2 pages will be read)", type=["pdf"], key=uploader_key)
+            pdf_file = st.file_uploader("Upload a PDF", type=["pdf"], key=uploader_key)
             if st.button("🚀 Analyse PDF", key="aya_send_pdf"):
                 if pdf_file:
                     try:
-                        st.session_state.aya_messages = []
-                        reader   = PyPDF2.PdfReader(pdf_file)
-                        pdf_text = ""
-                        for i in range(min(2, len(reader.pages))):
-                            pdf_text += reader.pages[i].extract_text()[:3000]
-                        st.session_state.aya_messages.append({"role": "user", "content": f"PROBLEM from PDF:\n{pdf_text}"})
+                        bar  = st.progress(0.0, text="📕 Reading PDF…")
+                        read = []   # stays empty when the document was cached
+
+                        def show_progress(done, total):
+                            read.append(done)
+                            bar.progress(done / total, text=f"📕 Read {done} of {total} pages…")
+
+                        started = time.perf_counter()
+                        doc = get_pdf_ingestor().ingest(pdf_file.getvalue(), progress=show_progress)
+                        metrics.record("pdf", latency=round(time.perf_counter() - started, 4), pages=len(doc["pages"]), cached=not read)
+                        bar.empty()
                         st.session_state.aya_uploader_key += 1
-                        st.rerun()
+                        if doc["problems"]:
+                            # Let the student pick a question from the paper below.
+                            st.session_state.aya_pdf = {"hash": doc["hash"], "name": pdf_file.name}
+                        else:
+                            st.session_state.aya_pdf = None
+                            st.session_state.aya_messages = [whole_pdf_problem(doc, pdf_file.name)]
+                        rerun_fragment()
                     except Exception as e:
                         st.error(f"Could not read PDF: {e}")
                 else:
                     st.warning("Please upload a PDF first.")
 
+            doc = get_pdf_ingestor().get(st.session_state.aya_pdf["hash"]) if st.session_state.aya_pdf else None
+            if doc:
+                choices = ["📄 Whole document"] + [
+                    f"{p['label']} (p. {p['page']}) — {' '.join(p['text'].split())[:70]}" for p in doc["problems"]
+                ]
+                pick = st.selectbox(
+                    f"Which problem from {st.session_state.aya_pdf['name']} should AyA solve?",
+                    range(len(choices)), format_func=lambda i: choices[i],
+                )
+                if st.button("🚀 Send to AyA", key="aya_send_problem"):
+                    if pick == 0:
+                        first = whole_pdf_problem(doc, st.session_state.aya_pdf["name"])
+                    else:
+                        first = {
+                            "role": "user", "doc": doc["hash"],
+                            "content": f"PROBLEM from PDF:\n{doc['problems'][pick - 1]['text']}",
+                        }
+                    st.session_state.aya_messages = [first]
+                    rerun_fragment()
+
     # ── Chat history ──────────────────────────────────────────
     if st.session_state.aya_messages:
         st.markdown('<span class="section-label lbl-purple">💬 Chat with AyA</span>', unsafe_allow_html=True)
 
-    for msg in st.session_state.aya_messages:
+    full = None
+    if any(m.get("spilled") for m in st.session_state.aya_messages):
+        if st.toggle("📜 Show full conversation", key="aya_full_history"):
+            full = store.load_messages(st.session_state.session_token)
+
+    for i, msg in enumerate(st.session_state.aya_messages):
+        if msg.get("spilled") and full and i < len(full):
+            msg = full[i]
         with st.chat_message(msg["role"]):
             content = msg["content"]
             if msg["role"] == "user" and (content.startswith("PROBLEM from PDF:") or content.startswith("PROBLEM:")):
@@ -631,47 +769,345 @@ if st.session_state.active_tab == "aya":
                     st.markdown(content)
             else:
                 st.markdown(content)
+            if msg.get("spilled"):
+                st.caption("Shortened to save memory — turn on “Show full conversation” to read it all.")
 
     # ── Trigger AI ────────────────────────────────────────────
     if st.session_state.aya_messages and st.session_state.aya_messages[-1]["role"] == "user":
         with st.chat_message("assistant"):
-            with st.spinner("🤖 AyA is thinking…"):
-                try:
-                    groq_client = Groq(api_key=GROQ_API_KEY)
-                    api_msgs    = [{"role": "system", "content": AYA_SYSTEM_PROMPT}] + st.session_state.aya_messages
-                    response_text = None
-
-                    for model_id in ["llama-3.3-70b-versatile", "llama-3.1-70b-versatile", "mixtral-8x7b-32768"]:
-                        try:
-                            resp = groq_client.chat.completions.create(
-                                messages=api_msgs,
-                                model=model_id,
-                                temperature=0.5,
-                                max_tokens=6000,
-                            )
-                            response_text = resp.choices[0].message.content
-                            break
-                        except Exception:
-                            continue
-
-                    if not response_text:
-                        response_text = "❌ Could not connect to AI. Please try again in a moment."
-
+            try:
+                attach_excerpts(st.session_state.aya_messages)
+                notice = st.empty()
+                stream = backend.aya(st.session_state.aya_messages, on_wait=queue_notice(notice))
+                # The spinner covers the wait for the first token; an empty
+                # stream means no model could answer.
+                with st.spinner("🤖 AyA is thinking…"):
+                    first = next(stream, None)
+                notice.empty()
+
+                if first is not None:
+                    response_text = st.write_stream(itertools.chain([first], stream))
+                else:
+                    response_text = "❌ Could not connect to AI. Please try again in a moment."
                     st.markdown(response_text)
-                    st.session_state.aya_messages.append({"role": "assistant", "content": response_text})
-                except Exception as e:
-                    st.error(f"System error: {e}")
+
+                st.session_state.aya_messages.append({"role": "assistant", "content": response_text})
+            except Exception as e:
+                st.error(f"System error: {e}")
 
     # ── Follow-up input ───────────────────────────────────────
     if st.session_state.aya_messages:
         if follow_up := st.chat_input("Ask AyA a follow-up question…"):
             st.session_state.aya_messages.append({"role": "user", "content": follow_up})
-            st.rerun()
+            rerun_fragment()
+
+    sync_session()
+
+
+if st.session_state.active_tab == "aya":
+
+    # ── Hero header ──────────────────────────────────────────
+    st.markdown("""
+    <div style="text-align:center;padding:32px 16px 20px;">
+      <div style="display:inline-flex;align-items:center;gap:8px;padding:5px 16px;
+                  border-radius:20px;background:rgba(109,40,217,.18);
+                  border:1px solid rgba(167,139,250,.4);margin-bottom:16px;">
+        <span style="width:8px;height:8px;border-radius:50%;background:#a78bfa;display:inline-block;
+                     box-shadow:0 0 8px #a78bfa;"></span>
+        <span style="font-size:.72rem;font-weight:800;letter-spacing:2px;color:#c4b5fd !important;">LIVE · 24 / 7</span>
+      </div>
+      <h1 style="font-size:clamp(2rem,6vw,3.5rem);font-weight:900;margin:0;
+                 background:linear-gradient(135deg,#fff 0%,#c4b5fd 35%,#00ffff 70%,#ffd700 100%);
+                 -webkit-background-clip:text;-webkit-text-fill-color:transparent;">
+        Meet AyA
+      </h1>
+      <p style="color:#94a3b8 !important;font-size:1rem;margin-top:8px;max-width:520px;margin-left:auto;margin-right:auto;line-height:1.7;">
+        Your 24/7 AI Tutor. Ask any doubt — Chemistry, Physics, Maths, Biology.<br>
+        She doesn't sleep. She doesn't judge. She simply teaches.
+      </p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    # ── Stats row ─────────────────────────────────────────────
+    sc1, sc2, sc3, sc4 = st.columns(4)
+    for col, num, lbl in [
+        (sc1, "24/7", "Always Online"),
+        (sc2, "₹0",  "Cost Forever"),
+        (sc3, "6+",  "Boards Covered"),
+        (sc4, "∞",   "Questions Answered"),
+    ]:
+        with col:
+            st.markdown(f"""
+            <div class="glass-card stat-box">
+              <div class="stat-num">{num}</div>
+              <div class="stat-lbl">{lbl}</div>
+            </div>""", unsafe_allow_html=True)
+
+    st.markdown("---")
+
+    aya_chat()
 
 # ─────────────────────────────────────────────────────────────
 # 10. MOCK TEST TAB
 # ─────────────────────────────────────────────────────────────
-elif st.session_state.active_tab == "mock":
+# ══════════════════════════════════════════════════════════
+# VIEW A: CONFIGURATION (no questions yet)
+# ══════════════════════════════════════════════════════════
+@st.fragment
+def mock_config_view(model_choice):
+    load_exam()
+    if st.session_state.mt_error:
+        st.error(st.session_state.mt_error)
+        st.session_state.mt_error = None
+
+    st.markdown('<span class="section-label lbl-gold">⚙️ Configure Your Test</span>', unsafe_allow_html=True)
+    st.markdown("")
+
+    past = store.exams(st.session_state.session_token)
+    if past:
+        with st.expander(f"🗂️ Your recent tests ({len(past)})"):
+            for e in past:
+                when = time.strftime("%d %b, %H:%M", time.localtime(e["created_at"]))
+                st.markdown(
+                    f"**{e['config'].get('subject','')} · {e['config'].get('chapter','')}** "
+                    f"({e['q_type']}) — {e['score']:g}/{e['total']:g} &nbsp; *{when}*"
+                )
+
+    with st.container(border=True):
+        left, right = st.columns(2, gap="large")
+
+        with left:
+            st.markdown("**📋 Exam Details**")
+            board      = st.selectbox("Board", ["CBSE", "ICSE", "IGCSE", "IB", "Tamil Nadu State Board", "Maharashtra Board", "Other"])
+            cls        = st.selectbox("Class", [str(i) for i in range(6, 13)] + ["NEET", "JEE", "Other"])
+            difficulty = st.selectbox("Difficulty", DIFFICULTIES)
+
+        with right:
+            st.markdown("**📚 Topic Details**")
+            subject = st.text_input("Subject", placeholder="e.g. Chemistry")
+            chapter = st.text_input("Chapter", placeholder="e.g. Electrochemistry")
+            qtype_col, qcount_col = st.columns(2)
+            with qtype_col:
+                q_type = st.radio("Question Type", Q_TYPES)
+            with qcount_col:
+                num_q  = st.number_input("Count", min_value=1, max_value=MAX_QUESTIONS, value=5)
+
+    st.markdown("")
+    if st.button("⚡ GENERATE MOCK TEST", type="primary"):
+        if not subject.strip() or not chapter.strip():
+            st.warning("⚠️ Please fill in the Subject and Chapter fields.")
+        else:
+            st.session_state.mt_user_answers = {}
+            st.session_state.mt_feedback     = None
+            st.session_state.mt_summary      = None
+            st.query_params.pop("exam", None)
+            st.session_state.mt_score        = 0
+            st.session_state.mt_q_type       = q_type
+            st.session_state.mt_config       = {
+                "board": board, "class": cls, "subject": subject,
+                "chapter": chapter, "difficulty": difficulty,
+            }
+            # VIEW C streams the paper in, so the first questions show up
+            # while the rest are still being written.
+            st.session_state.mt_questions = []
+            st.session_state.mt_pending   = {
+                "model": model_choice, "board": board, "cls": cls, "subject": subject,
+                "chapter": chapter, "num": num_q, "difficulty": difficulty, "q_type": q_type,
+            }
+            st.rerun()
+
+# ══════════════════════════════════════════════════════════
+# VIEW B: RESULTS
+# ══════════════════════════════════════════════════════════
+@st.fragment(run_every=1.0)
+def feedback_poller():
+    # Shows a running job's progress; once it finishes, a full rerun redraws
+    # the results view without this poller.
+    load_exam()
+    job = backend.job(st.session_state.mt_job) if st.session_state.mt_job else None
+    if job is None or job["status"] not in ("queued", "running"):
+        if job:
+            apply_job(job)
+        else:
+            st.session_state.mt_job = None
+        st.rerun()
+
+    progress = job["progress"] or {}
+    if progress.get("queue"):
+        st.caption(f"⏳ Lots of students are submitting right now — you're #{progress['queue']} in line…")
+    elif job["kind"] == "mcq_summary":
+        if progress.get("text"):
+            st.markdown(progress["text"] + " ▌")
+        else:
+            st.caption("✍️ AyA is writing your study advice…")
+    elif progress.get("total"):
+        st.progress(progress["done"] / progress["total"], text=f"🧠 Marked {progress['done']} of {progress['total']} answers…")
+    else:
+        st.caption("🧠 Your answers are being marked…")
+
+@st.fragment
+def mock_results_view():
+    load_exam()
+    cfg     = st.session_state.mt_config
+    score   = st.session_state.mt_score
+    total   = st.session_state.mt_total_marks
+    pending = st.session_state.mt_job is not None
+    graded  = st.session_state.mt_feedback is not None
+
+    badge = f"{score:g} / {total:g}" if graded else f"… / {total:g}"
+    st.markdown(f"""
+    <div class="gold-card" style="text-align:center;">
+      <div class="section-label lbl-gold">📊 Result Analysis</div>
+      <p style="color:#94a3b8 !important;margin:4px 0 12px;">
+        {cfg.get('board','')} · Class {cfg.get('class','')} · {cfg.get('subject','')} · {cfg.get('chapter','')}
+      </p>
+      <div class="score-badge">{badge}</div>
+    </div>
+    """, unsafe_allow_html=True)
+
+    if graded:
+        pct = round((score / total) * 100) if total else 0
+        m1, m2, m3 = st.columns(3)
+        m1.metric("Score",      f"{score:g}/{total:g}")
+        m2.metric("Percentage", f"{pct}%")
+        m3.metric("Status",     "✅ Pass" if pct >= 40 else "❌ Needs Work")
+
+    st.markdown('<div class="purple-card">', unsafe_allow_html=True)
+    st.markdown("### 🧠 Examiner's Feedback")
+    if st.session_state.mt_q_type == "MCQ":
+        st.markdown(st.session_state.mt_feedback)
+        if score < total:
+            st.markdown("### 🎯 AyA's Study Advice")
+            if pending:
+                feedback_poller()
+            elif st.session_state.mt_summary:
+                st.markdown(st.session_state.mt_summary)
+            else:
+                st.caption("Study advice is unavailable right now — the breakdown above covers every mistake.")
+    elif pending:
+        feedback_poller()
+    elif st.session_state.mt_feedback.get("error"):
+        st.error(f"❌ Grading failed: {st.session_state.mt_feedback['error']}")
+        if st.button("🔁 Retry grading"):
+            job_id = st.session_state.mt_feedback["job"]
+            try:
+                st.session_state.mt_job = backend.retry(job_id)
+            except ValueError:
+                # Already retried from another tab; follow the job as it stands.
+                st.session_state.mt_job = job_id
+            st.session_state.mt_feedback = None
+            st.rerun()
+    else:
+        for r in st.session_state.mt_feedback["results"]:
+            awarded = "—" if r["awarded"] is None else f"{r['awarded']:g}"
+            st.markdown(f"**Q{r['id']}.** {r['question']} &nbsp; **{awarded} / {r['marks']:g}**")
+            st.markdown(r["reason"])
+            if r["missing"]:
+                st.markdown("*Missing:* " + ", ".join(r["missing"]))
+            st.markdown("---")
+    st.markdown('</div>', unsafe_allow_html=True)
+
+    if st.session_state.mt_q_type == "MCQ":
+        with st.expander("📋 Full Answer Key"):
+            for q in st.session_state.mt_questions:
+                q_id  = str(q["id"])
+                u_ans = st.session_state.mt_user_answers.get(q_id)
+                c_ans = q["correct_answer"]
+                is_ok = u_ans == c_ans
+                st.markdown(f"**Q{q['id']}.** {q['question']}")
+                if is_ok:
+                    st.markdown(f'<span class="ans-correct">✅ {u_ans}</span>', unsafe_allow_html=True)
+                else:
+                    st.markdown(f'<span class="ans-wrong">❌ Your answer: {u_ans}</span>', unsafe_allow_html=True)
+                    st.markdown(f'<span class="ans-correct">✅ Correct: {c_ans}</span>', unsafe_allow_html=True)
+                st.markdown("---")
+
+    st.markdown("")
+    if st.button("🔄 New Test"):
+        if graded:
+            store.archive_exam(st.session_state.session_token, {
+                "config": cfg, "q_type": st.session_state.mt_q_type, "score": score, "total": total,
+                "questions": st.session_state.mt_questions, "answers": st.session_state.mt_user_answers,
+                "feedback": st.session_state.mt_feedback, "summary": st.session_state.mt_summary,
+            })
+        st.session_state.mt_questions    = None
+        st.session_state.mt_feedback     = None
+        st.session_state.mt_summary      = None
+        st.session_state.mt_job          = None
+        st.session_state.mt_user_answers = {}
+        st.session_state.mt_score        = 0
+        st.query_params.pop("exam", None)
+        st.rerun()
+
+# ══════════════════════════════════════════════════════════
+# VIEW C: EXAM INTERFACE
+# ══════════════════════════════════════════════════════════
+@st.fragment
+def mock_exam_view(model_choice):
+    load_exam()
+    cfg = st.session_state.mt_config
+    st.markdown(f"""
+    <div class="cyan-card">
+      <div class="section-label lbl-cyan">📝 Exam in Progress</div>
+      <p style="color:#e2e8f0 !important;margin-top:8px;font-size:.95rem;">
+        <strong>{cfg.get('board','')} · Class {cfg.get('class','')} · {cfg.get('subject','')} · {cfg.get('chapter','')}</strong>
+        &nbsp;|&nbsp; {cfg.get('difficulty','')} · {st.session_state.mt_q_type}
+      </p>
+    </div>
+    """, unsafe_allow_html=True)
+
+    pending = st.session_state.mt_pending
+    if pending:
+        progress  = st.empty()
+        questions = stream_exam_paper(pending, progress)
+    else:
+        questions = st.session_state.mt_questions
+
+    with st.form("exam_form"):
+        for q in questions:
+            marks_txt = f" *({q.get('marks', 1)} Marks)*" if st.session_state.mt_q_type == "Descriptive" else ""
+            st.markdown(f"**Q{q['id']}.** {q['question']}{marks_txt}")
+
+            if st.session_state.mt_q_type == "MCQ":
+                st.radio(
+                    "Select your answer:",
+                    q["options"],
+                    key=f"ans_{q['id']}",
+                    index=None,
+                    label_visibility="collapsed"
+                )
+            else:
+                st.text_area(
+                    "Write your answer:",
+                    key=f"ans_{q['id']}",
+                    height=110,
+                    label_visibility="collapsed",
+                    placeholder="Type your answer here…"
+                )
+            st.markdown("---")
+
+        submitted = st.form_submit_button("✅ Submit Exam")
+
+    if pending and not st.session_state.mt_questions:
+        st.rerun()
+
+    if submitted:
+        all_answered = True
+        for q in st.session_state.mt_questions:
+            val = st.session_state.get(f"ans_{q['id']}")
+            if (val is None or val == "") and st.session_state.mt_q_type == "MCQ":
+                all_answered = False
+            st.session_state.mt_user_answers[str(q["id"])] = val
+
+        if not all_answered:
+            st.error("⚠️ Please answer all questions before submitting.")
+        else:
+            # MCQ scores show straight away; feedback that needs the model
+            # is finished by a grading job the results view polls.
+            submit_exam(model_choice)
+            st.rerun()
+
+if st.session_state.active_tab == "mock":
 
     # ── Hero header ──────────────────────────────────────────
     st.markdown("""
@@ -696,184 +1132,24 @@ elif st.session_state.active_tab == "mock":
     # ── Model picker (hidden) ─────────────────────────────────
     model_choice = "llama-3.3-70b-versatile"
     with st.expander("🛠️ Advanced — AI Model Selection", expanded=False):
-        if st.session_state.mt_models:
+        available_models = backend.models()
+        if available_models:
             default_ix = 0
-            for i, m in enumerate(st.session_state.mt_models):
+            for i, m in enumerate(available_models):
                 if "llama-3.3" in m:
                     default_ix = i
                     break
-            model_choice = st.selectbox("Model", st.session_state.mt_models, index=default_ix)
-
-    # ══════════════════════════════════════════════════════════
-    # VIEW A: CONFIGURATION (no questions yet)
-    # ══════════════════════════════════════════════════════════
-    if not st.session_state.mt_questions:
-        st.markdown('<span class="section-label lbl-gold">⚙️ Configure Your Test</span>', unsafe_allow_html=True)
-        st.markdown("")
-
-        with st.container(border=True):
-            left, right = st.columns(2, gap="large")
-
-            with left:
-                st.markdown("**📋 Exam Details**")
-                board      = st.selectbox("Board", ["CBSE", "ICSE", "IGCSE", "IB", "Tamil Nadu State Board", "Maharashtra Board", "Other"])
-                cls        = st.selectbox("Class", [str(i) for i in range(6, 13)] + ["NEET", "JEE", "Other"])
-                difficulty = st.selectbox("Difficulty", ["Easy", "Medium", "Hard"])
-
-            with right:
-                st.markdown("**📚 Topic Details**")
-                subject = st.text_input("Subject", placeholder="e.g. Chemistry")
-                chapter = st.text_input("Chapter", placeholder="e.g. Electrochemistry")
-                qtype_col, qcount_col = st.columns(2)
-                with qtype_col:
-                    q_type = st.radio("Question Type", ["MCQ", "Descriptive"])
-                with qcount_col:
-                    num_q  = st.number_input("Count", min_value=1, max_value=20, value=5)
-
-        st.markdown("")
-        if st.button("⚡ GENERATE MOCK TEST", type="primary"):
-            if not subject.strip() or not chapter.strip():
-                st.warning("⚠️ Please fill in the Subject and Chapter fields.")
-            else:
-                with st.spinner(f"🧠 Generating {board} pattern {q_type}s for {chapter}…"):
-                    st.session_state.mt_user_answers = {}
-                    st.session_state.mt_feedback     = None
-                    st.session_state.mt_score        = 0
-                    st.session_state.mt_q_type       = q_type
-                    st.session_state.mt_config       = {
-                        "board": board, "class": cls, "subject": subject,
-                        "chapter": chapter, "difficulty": difficulty,
-                    }
-                    qs = generate_questions(
-                        GROQ_API_KEY, model_choice,
-                        board, cls, subject, chapter, num_q, difficulty, q_type
-                    )
-                    if qs:
-                        st.session_state.mt_questions = qs
-                        st.rerun()
-
-    # ══════════════════════════════════════════════════════════
-    # VIEW B: RESULTS
-    # ══════════════════════════════════════════════════════════
-    elif st.session_state.mt_feedback:
-        cfg   = st.session_state.mt_config
-        score = st.session_state.mt_score
-        total = st.session_state.mt_total_marks
-
-        st.markdown(f"""
-        <div class="gold-card" style="text-align:center;">
-          <div class="section-label lbl-gold">📊 Result Analysis</div>
-          <p style="color:#94a3b8 !important;margin:4px 0 12px;">
-            {cfg.get('board','')} · Class {cfg.get('class','')} · {cfg.get('subject','')} · {cfg.get('chapter','')}
-          </p>
-          {'<div class="score-badge">' + str(score) + ' / ' + str(total) + '</div>' if st.session_state.mt_q_type == "MCQ" else ''}
-        </div>
-        """, unsafe_allow_html=True)
-
-        if st.session_state.mt_q_type == "MCQ":
-            pct = round((score / total) * 100) if total else 0
-            m1, m2, m3 = st.columns(3)
-            m1.metric("Score",      f"{score}/{total}")
-            m2.metric("Percentage", f"{pct}%")
-            m3.metric("Status",     "✅ Pass" if pct >= 40 else "❌ Needs Work")
-
-        st.markdown('<div class="purple-card">', unsafe_allow_html=True)
-        st.markdown("### 🧠 Examiner's Feedback")
-        st.markdown(st.session_state.mt_feedback)
-        st.markdown('</div>', unsafe_allow_html=True)
-
-        if st.session_state.mt_q_type == "MCQ":
-            with st.expander("📋 Full Answer Key"):
-                for q in st.session_state.mt_questions:
-                    q_id  = str(q["id"])
-                    u_ans = st.session_state.mt_user_answers.get(q_id)
-                    c_ans = q["correct_answer"]
-                    is_ok = u_ans == c_ans
-                    st.markdown(f"**Q{q['id']}.** {q['question']}")
-                    if is_ok:
-                        st.markdown(f'<span class="ans-correct">✅ {u_ans}</span>', unsafe_allow_html=True)
-                    else:
-                        st.markdown(f'<span class="ans-wrong">❌ Your answer: {u_ans}</span>', unsafe_allow_html=True)
-                        st.markdown(f'<span class="ans-correct">✅ Correct: {c_ans}</span>', unsafe_allow_html=True)
-                    st.markdown("---")
-
-        st.markdown("")
-        if st.button("🔄 New Test"):
-            st.session_state.mt_questions    = None
-            st.session_state.mt_feedback     = None
-            st.session_state.mt_user_answers = {}
-            st.session_state.mt_score        = 0
-            st.rerun()
-
-    # ══════════════════════════════════════════════════════════
-    # VIEW C: EXAM INTERFACE
-    # ══════════════════════════════════════════════════════════
+            model_choice = st.selectbox("Model", available_models, index=default_ix)
+
+    # Each view is its own fragment: filling in the config, answering in the
+    # exam form or reading results reruns only that view. Moving between
+    # views is a full rerun.
+    if not st.session_state.mt_questions and not st.session_state.mt_pending:
+        mock_config_view(model_choice)
+    elif st.session_state.mt_feedback or st.session_state.mt_job:
+        mock_results_view()
     else:
-        cfg = st.session_state.mt_config
-        st.markdown(f"""
-        <div class="cyan-card">
-          <div class="section-label lbl-cyan">📝 Exam in Progress</div>
-          <p style="color:#e2e8f0 !important;margin-top:8px;font-size:.95rem;">
-            <strong>{cfg.get('board','')} · Class {cfg.get('class','')} · {cfg.get('subject','')} · {cfg.get('chapter','')}</strong>
-            &nbsp;|&nbsp; {cfg.get('difficulty','')} · {st.session_state.mt_q_type}
-          </p>
-        </div>
-        """, unsafe_allow_html=True)
-
-        with st.form("exam_form"):
-            for q in st.session_state.mt_questions:
-                marks_txt = f" *({q.get('marks', 1)} Marks)*" if st.session_state.mt_q_type == "Descriptive" else ""
-                st.markdown(f"**Q{q['id']}.** {q['question']}{marks_txt}")
-
-                if st.session_state.mt_q_type == "MCQ":
-                    st.radio(
-                        "Select your answer:",
-                        q["options"],
-                        key=f"ans_{q['id']}",
-                        index=None,
-                        label_visibility="collapsed"
-                    )
-                else:
-                    st.text_area(
-                        "Write your answer:",
-                        key=f"ans_{q['id']}",
-                        height=110,
-                        label_visibility="collapsed",
-                        placeholder="Type your answer here…"
-                    )
-                st.markdown("---")
-
-            submitted = st.form_submit_button("✅ Submit Exam")
-
-        if submitted:
-            all_answered = True
-            for q in st.session_state.mt_questions:
-                val = st.session_state.get(f"ans_{q['id']}")
-                if (val is None or val == "") and st.session_state.mt_q_type == "MCQ":
-                    all_answered = False
-                st.session_state.mt_user_answers[str(q["id"])] = val
-
-            if not all_answered:
-                st.error("⚠️ Please answer all questions before submitting.")
-            else:
-                with st.spinner("🧠 Evaluating your performance…"):
-                    cfg = st.session_state.mt_config
-                    if st.session_state.mt_q_type == "MCQ":
-                        fb = grade_mcq(
-                            GROQ_API_KEY, model_choice,
-                            st.session_state.mt_questions,
-                            st.session_state.mt_user_answers,
-                            cfg.get("board","Board"), cfg.get("class","Class"), cfg.get("subject","Subject")
-                        )
-                    else:
-                        fb = grade_descriptive(
-                            GROQ_API_KEY, model_choice,
-                            st.session_state.mt_questions,
-                            st.session_state.mt_user_answers,
-                            cfg.get("board","Board"), cfg.get("class","Class"), cfg.get("subject","Subject")
-                        )
-                    st.session_state.mt_feedback = fb
-                    st.rerun()
+        mock_exam_view(model_choice)
 
 # ─────────────────────────────────────────────────────────────
 # 11. FOOTER
@@ -884,3 +1160,9 @@ st.markdown("""
   Madurai, Tamil Nadu &nbsp;·&nbsp; Built by Mohammed Salmaan M. &nbsp;·&nbsp; Pure Teaching Intelligence
 </div>
 """, unsafe_allow_html=True)
+
+sync_session()
+
+# Only runs that reach the end are timed; st.rerun() and st.stop() cut a
+# run short, and fragment reruns don't re-execute the script.
+metrics.record("rerun", latency=round(time.perf_counter() - RUN_STARTED, 4), tab=st.session_state.active_tab)
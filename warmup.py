@@ -0,0 +1,290 @@
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import openai
+from openai import OpenAI
+
+from backend import GROQ_BASE_URL, QUESTION_BANK, QUESTION_INDEX, RATE_LIMITS, load_secrets
+from metrics import Metrics
+from paper_gen import DIFFICULTIES, MAX_QUESTIONS, Q_TYPES, clean_input, iter_paper, paper_context, paper_problems
+from question_bank import QuestionBank, paper_key
+from question_index import QuestionIndex, partition_key
+from scheduler import RateLimitScheduler
+
+# ─────────────────────────────────────────────────────────────
+# QUESTION BANK WARM-UP
+#   Fills the question bank ahead of time from a syllabus matrix, so at
+#   peak hours a Mock Test is drawn from disk instead of generated. Each
+#   combination gets a full pool of validated papers. Progress is
+#   checkpointed after every paper and the bank itself records what is
+#   done, so an interrupted run picks up where it stopped when rerun.
+#   Settings come from the app's .streamlit/secrets.toml.
+#
+#   python warmup.py syllabus.csv --concurrency 4
+#
+#   The matrix is a CSV with the columns below, or a JSON list of objects
+#   with the same keys. A cell may list alternatives, "|"-separated in CSV
+#   or as a JSON list, and every combination of a row is warmed:
+#
+#   board,class,subject,chapter,difficulty,type,count
+#   CBSE,11|12,Chemistry,Electrochemistry|Chemical Kinetics,Easy|Medium|Hard,MCQ,10
+# ─────────────────────────────────────────────────────────────
+FIELDS = ("board", "class", "subject", "chapter", "difficulty", "type", "count")
+
+# Defaults for a [warmup] table in Streamlit Secrets; command-line flags
+# override both.
+WARMUP = {
+    "model":        "llama-3.3-70b-versatile",
+    "concurrency":  4,      # combinations generated at once
+    "share":        0.5,    # of the [rate_limits] budget, leaving the rest to live students
+    "max_attempts": 3,      # rejected or failed papers before a combination is given up
+    "checkpoint":   "data/warmup_checkpoint.json",
+    "jsonl_path":   "data/metrics/warmup.jsonl",
+    "prom_path":    "data/metrics/warmup.prom",
+}
+
+
+def cell_values(value, sep):
+    if isinstance(value, list):
+        return [str(v).strip() for v in value]
+    return [v.strip() for v in str(value).split(sep)] if sep else [str(value).strip()]
+
+
+def load_matrix(path):
+    # One task per distinct paper key, in file order.
+    if path.endswith(".json"):
+        with open(path, encoding="utf-8") as f:
+            rows, sep = json.load(f), None
+    else:
+        with open(path, encoding="utf-8", newline="") as f:
+            rows, sep = list(csv.DictReader(f)), "|"
+
+    tasks, seen = [], set()
+    for line, row in enumerate(rows, start=2 if sep else 1):
+        missing = [k for k in FIELDS if not str(row.get(k) or "").strip()]
+        if missing:
+            raise ValueError(f"{path}, entry {line}: missing {', '.join(missing)}")
+        for board, cls, subject, chapter, difficulty, q_type, count in itertools.product(
+            *(cell_values(row[k], sep) for k in FIELDS)
+        ):
+            if difficulty not in DIFFICULTIES:
+                raise ValueError(f"{path}, entry {line}: difficulty must be one of {', '.join(DIFFICULTIES)}")
+            if q_type not in Q_TYPES:
+                raise ValueError(f"{path}, entry {line}: type must be one of {', '.join(Q_TYPES)}")
+            if not count.isdigit() or not 1 <= int(count) <= MAX_QUESTIONS:
+                raise ValueError(f"{path}, entry {line}: count must be 1-{MAX_QUESTIONS}")
+            # Keyed exactly as the Mock Test tab keys its lookups.
+            subject, chapter = clean_input(subject), clean_input(chapter)
+            key = paper_key(board, cls, subject, chapter, difficulty, q_type, int(count))
+            if key in seen:
+                continue
+            seen.add(key)
+            tasks.append({
+                "key": key, "board": board, "cls": cls, "subject": subject, "chapter": chapter,
+                "difficulty": difficulty, "q_type": q_type, "num": int(count),
+            })
+    return tasks
+
+
+def task_label(t):
+    return f"{t['board']} {t['cls']} {t['subject']} · {t['chapter']} ({t['difficulty']} {t['q_type']} ×{t['num']})"
+
+
+class Checkpoint:
+    # key -> {"papers": added this far, "attempts": failures, "error": last}.
+    # Rewritten atomically after every paper.
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.data = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.data = json.load(f)
+        elif os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def entry(self, key):
+        with self.lock:
+            return dict(self.data.get(key, {"papers": 0, "attempts": 0, "error": None}))
+
+    def update(self, key, **fields):
+        with self.lock:
+            self.data.setdefault(key, {"papers": 0, "attempts": 0, "error": None}).update(fields)
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.data, f, indent=1)
+            os.replace(tmp, self.path)
+
+
+class Warmup:
+    def __init__(self, client, bank, index, scheduler, metrics, checkpoint, model, papers, max_attempts):
+        self.client       = client
+        self.bank         = bank
+        self.index        = index
+        self.scheduler    = scheduler
+        self.metrics      = metrics
+        self.checkpoint   = checkpoint
+        self.model        = model
+        self.papers       = papers
+        self.max_attempts = max_attempts
+        self.stop         = threading.Event()
+        self.print_lock   = threading.Lock()
+        self.totals       = {"added": 0, "rejected": 0, "complete": 0, "gave_up": 0}
+
+    def log(self, text):
+        with self.print_lock:
+            print(text, flush=True)
+
+    def count(self, name):
+        with self.print_lock:
+            self.totals[name] += 1
+
+    def run_task(self, task):
+        key     = task["key"]
+        context = paper_context(task["board"], task["cls"], task["subject"], task["chapter"])
+        part    = partition_key(task["board"], task["cls"], task["subject"], task["chapter"])
+        label   = task_label(task)
+        while not self.stop.is_set():
+            have  = self.bank.fresh(key)
+            state = self.checkpoint.entry(key)
+            if have >= self.papers:
+                self.count("complete")
+                return
+            if state["attempts"] >= self.max_attempts:
+                self.count("gave_up")
+                self.log(f"✗ {label}: gave up after {state['attempts']} failed papers ({state['error']})")
+                return
+
+            started = time.monotonic()
+            try:
+                questions = list(iter_paper(
+                    self.client, self.model, context, task["num"], task["difficulty"], task["q_type"],
+                    self.scheduler, self.metrics, priority="background",
+                    is_repeat=lambda q: self.index.is_duplicate(part, q["question"]),
+                ))
+                problems = paper_problems(questions, task["num"], task["q_type"])
+            except Exception as e:
+                problems = [f"{type(e).__name__}: {e}"]
+
+            if problems:
+                self.count("rejected")
+                self.checkpoint.update(key, attempts=state["attempts"] + 1, error="; ".join(problems)[:300])
+                self.log(f"  {label}: paper rejected ({'; '.join(problems[:3])})")
+                continue
+            self.bank.add(key, questions)
+            self.index.record(part, [q["question"] for q in questions])
+            self.count("added")
+            self.checkpoint.update(key, papers=state["papers"] + 1, error=None)
+            self.log(f"✓ {label}: paper {have + 1}/{self.papers} in {time.monotonic() - started:.1f}s")
+
+    def run(self, tasks, concurrency):
+        pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="warmup")
+        futures = [pool.submit(self.run_task, t) for t in tasks]
+        try:
+            for fut in as_completed(futures):
+                fut.result()
+        except KeyboardInterrupt:
+            # Papers in flight are dropped; everything stored so far stays.
+            self.stop.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+            self.log("Interrupted. Run the same command again to resume.")
+            raise
+        pool.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate the question bank from a syllabus matrix.")
+    parser.add_argument("matrix",                             help="syllabus matrix, .csv or .json")
+    parser.add_argument("--secrets",      default=".streamlit/secrets.toml")
+    parser.add_argument("--model")
+    parser.add_argument("--concurrency",  type=int)
+    parser.add_argument("--papers",       type=int,   help="papers per combination; defaults to the bank's pool size")
+    parser.add_argument("--share",        type=float, help="share of the app's rate limits to use")
+    parser.add_argument("--max-attempts", type=int)
+    parser.add_argument("--checkpoint")
+    parser.add_argument("--retry-failed", action="store_true", help="try combinations that were given up on again")
+    parser.add_argument("--dry-run",      action="store_true", help="list what would be generated and stop")
+    args = parser.parse_args()
+
+    secrets = load_secrets(args.secrets)
+    config  = dict(WARMUP, **secrets.get("warmup", {}))
+    for k in ("model", "concurrency", "share", "max_attempts", "checkpoint"):
+        if getattr(args, k) is not None:
+            config[k] = getattr(args, k)
+
+    bank_config = {**QUESTION_BANK, **secrets.get("question_bank", {})}
+    bank        = QuestionBank(**bank_config)
+    papers      = args.papers or bank.pool_size
+    if papers < bank.pool_size:
+        print(f"Note: the app only draws from a full pool of {bank.pool_size} papers; "
+              f"{papers} per combination will still be topped up on demand.")
+
+    try:
+        tasks = load_matrix(args.matrix)
+    except (OSError, ValueError) as e:
+        sys.exit(f"Can't read the matrix: {e}")
+    checkpoint = Checkpoint(config["checkpoint"])
+    if args.retry_failed:
+        for t in tasks:
+            if checkpoint.entry(t["key"])["attempts"]:
+                checkpoint.update(t["key"], attempts=0)
+
+    todo = [t for t in tasks if bank.fresh(t["key"]) < papers]
+    need = sum(papers - bank.fresh(t["key"]) for t in todo)
+    print(f"{len(tasks)} combinations, {len(tasks) - len(todo)} already warm, {need} papers to generate.")
+    if len(tasks) * papers > bank.max_papers:
+        print(f"Warning: {len(tasks) * papers} papers exceed the bank's max_papers of {bank.max_papers}; "
+              f"the least recently used will be evicted.")
+    if args.dry_run:
+        for t in todo:
+            print(f"  {task_label(t)}: {papers - bank.fresh(t['key'])} papers")
+        return
+    if not todo:
+        return
+
+    api_key = secrets.get("GROQ_API_KEY") or os.environ.get("GROQ_API_KEY")
+    if not api_key:
+        sys.exit(f"GROQ_API_KEY not found in {args.secrets} or the environment.")
+    base_url = secrets.get("GROQ_BASE_URL", GROQ_BASE_URL).rstrip("/")
+
+    # This process has its own buckets, so it takes only its share of the
+    # plan; Groq's rate-limit headers and 429s still slow it down when the
+    # app is using more than the rest.
+    limits    = {**RATE_LIMITS, **secrets.get("rate_limits", {})}
+    scheduler = RateLimitScheduler(rpm=limits["rpm"] * config["share"], tpm=limits["tpm"] * config["share"])
+    metrics   = Metrics(config["jsonl_path"], config["prom_path"])
+    client    = OpenAI(
+        api_key=api_key,
+        base_url=f"{base_url}/openai/v1",
+        max_retries=0,   # the scheduler re-queues 429s and retries 5xx itself
+        http_client=openai.DefaultHttpxClient(event_hooks={"response": [scheduler.observe]}),
+    )
+
+    index   = QuestionIndex(**{**QUESTION_INDEX, **secrets.get("question_index", {})})
+    warmup  = Warmup(client, bank, index, scheduler, metrics, checkpoint, config["model"], papers, config["max_attempts"])
+    started = time.monotonic()
+    try:
+        warmup.run(todo, config["concurrency"])
+    except KeyboardInterrupt:
+        sys.exit(130)
+    finally:
+        with metrics.lock:
+            metrics.flush()
+
+    t = warmup.totals
+    print(f"Done in {time.monotonic() - started:.0f}s: {t['added']} papers added, {t['rejected']} rejected, "
+          f"{t['complete']} combinations warm, {t['gave_up']} given up.")
+    if t["gave_up"]:
+        print("Rerun with --retry-failed to try the given-up combinations again.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()